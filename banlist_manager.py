@@ -6,13 +6,14 @@ import asyncio
 import math
 import re # 新增正则
 from typing import Dict, List, Tuple, Optional, Any
-from aiohttp import TCPConnector 
 from astrbot.api.all import logger
+from .deck import Deck
 
 
 class BanlistManager:
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, http):
         self.data_dir = data_dir
+        self.http = http  # 插件共享的 HttpClient
         self.banlist_cache_file = os.path.join(self.data_dir, "banlist_cache.json")
         self.name_map_file = os.path.join(self.data_dir, "banlist_name_map.json")
         self.genesys_file = os.path.join(self.data_dir, "genesys_cache.json")
@@ -59,7 +60,6 @@ class BanlistManager:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Connection": "keep-alive",
         }
         api_headers = headers.copy()
         api_headers.update({
@@ -70,51 +70,53 @@ class BanlistManager:
             "Referer": "https://registration.yugioh-card.com/genesys/CardList/"
         })
 
+        # 官网接口较慢，单次请求放宽超时
+        timeout = aiohttp.ClientTimeout(total=60)
+
         try:
-            connector = aiohttp.TCPConnector(ssl=False, force_close=True)
-            # 使用单独的 Session，不要和 card_searcher 混用
-            async with aiohttp.ClientSession(headers=headers, connector=connector, trust_env=True, timeout=aiohttp.ClientTimeout(total=60)) as session:
-                
-                # 1. Session 预热
-                logger.info("Genesys: 正在连接服务器...")
-                try:
-                    async with session.get(main_page_url,ssl=False) as r: await r.read()
-                except: pass
+            # 复用共享连接池 (Cookie 按域名隔离，不会影响百鸽查卡)
+            session = self.http.session
+            
+            # 1. Session 预热
+            logger.info("Genesys: 正在连接服务器...")
+            try:
+                async with session.get(main_page_url, headers=headers, timeout=timeout, ssl=False) as r: await r.read()
+            except: pass
 
-                # 2. 获取总数
-                pl = {"currentPage": 1, "resultsPerPage": 100, "searchTerm": ""}
-                async with session.post(api_url, data=pl, headers=api_headers) as resp:
-                    if resp.status != 200: return False, f"API 连接失败 {resp.status}", []
-                    try:
-                        res_json = await resp.json()
-                    except:
-                        return False, "API 返回非 JSON，可能被拦截", []
-                
-                if res_json.get("Success") != "Success":
-                    return False, f"API 逻辑错误", []
+            # 2. 获取总数
+            pl = {"currentPage": 1, "resultsPerPage": 100, "searchTerm": ""}
+            async with session.post(api_url, data=pl, headers=api_headers, timeout=timeout) as resp:
+                if resp.status != 200: return False, f"API 连接失败 {resp.status}", []
+                try:
+                    res_json = await resp.json()
+                except:
+                    return False, "API 返回非 JSON，可能被拦截", []
+            
+            if res_json.get("Success") != "Success":
+                return False, f"API 逻辑错误", []
 
-                total_results = res_json["Result"]["TotalResults"]
-                total_pages = math.ceil(total_results / 100)
-                logger.info(f"Genesys: 发现 {total_results} 条数据，开始下载 (共 {total_pages} 页)...")
+            total_results = res_json["Result"]["TotalResults"]
+            total_pages = math.ceil(total_results / 100)
+            logger.info(f"Genesys: 发现 {total_results} 条数据，开始下载 (共 {total_pages} 页)...")
 
-                # 3. 顺序抓取 (解决数量变少问题)
-                all_raw_items = []
-                for page in range(1, total_pages + 1):
-                    # 稍微延时，防封 + 减轻服务器压力
-                    await asyncio.sleep(0.5) 
-                    try:
-                        pl = {"currentPage": page, "resultsPerPage": 100, "searchTerm": ""}
-                        async with session.post(api_url, data=pl, headers=api_headers) as p_resp:
-                            if p_resp.status == 200:
-                                d = await p_resp.json()
-                                items = d.get("Result", {}).get("Results", [])
-                                if items:
-                                    all_raw_items.extend(items)
-                                    logger.info(f"Genesys: 第 {page}/{total_pages} 页下载成功 (当前共 {len(all_raw_items)} 条)")
-                                else:
-                                    logger.warning(f"Genesys: 第 {page} 页为空")
-                    except Exception as e:
-                        logger.error(f"Genesys: 第 {page} 页抓取失败: {e}")
+            # 3. 顺序抓取 (解决数量变少问题)
+            all_raw_items = []
+            for page in range(1, total_pages + 1):
+                # 稍微延时，防封 + 减轻服务器压力
+                await asyncio.sleep(0.5) 
+                try:
+                    pl = {"currentPage": page, "resultsPerPage": 100, "searchTerm": ""}
+                    async with session.post(api_url, data=pl, headers=api_headers, timeout=timeout) as p_resp:
+                        if p_resp.status == 200:
+                            d = await p_resp.json()
+                            items = d.get("Result", {}).get("Results", [])
+                            if items:
+                                all_raw_items.extend(items)
+                                logger.info(f"Genesys: 第 {page}/{total_pages} 页下载成功 (当前共 {len(all_raw_items)} 条)")
+                            else:
+                                logger.warning(f"Genesys: 第 {page} 页为空")
+                except Exception as e:
+                    logger.error(f"Genesys: 第 {page} 页抓取失败: {e}")
 
             # 4. 解析 ID 并获取中文名 (解决英文名问题)
             logger.info(f"Genesys: 下载完毕，开始解析 {len(all_raw_items)} 条数据的 ID 和中文名...")
@@ -139,6 +141,9 @@ class BanlistManager:
                         cn_name = en_name # 默认英文
                         final_id = None
                         
+                        # 名称缓存未命中时，先尝试本地名称索引
+                        local = None if en_name in self.name_map else card_searcher.resolve_name(en_name)
+
                         # A. 查本地缓存
                         if en_name in self.name_map:
                             final_id = self.name_map[en_name]
@@ -150,7 +155,13 @@ class BanlistManager:
                                 if detail: cn_name = detail.get("cn_name", en_name)
                             except: pass
                         
-                        # B. 查百鸽 API (如果本地没ID)
+                        # B. 查本地名称索引 (已导入离线卡库时无需联网)
+                        elif local:
+                            final_id = str(local["id"])
+                            cn_name = local.get("cn_name", en_name)
+                            self.name_map[en_name] = final_id
+
+                        # C. 查百鸽 API (如果本地没ID)
                         else:
                             await asyncio.sleep(0.2) # 避嫌
                             res = await card_searcher.search_card(en_name)
@@ -193,23 +204,23 @@ class BanlistManager:
         headers = {"User-Agent": "Mozilla/5.0 ..."} # 简略
 
         try:
-            async with aiohttp.ClientSession(trust_env=True, headers=headers) as session:
-                # 1. 获取列表
-                list_url = f"https://gamekingapi.windoent.com/forbidden/forbbidengroup/webList?type={api_type}"
-                async with session.get(list_url, ssl=False) as resp:
-                    if resp.status != 200: return False, f"列表请求失败 {resp.status}", []
-                    list_data = await resp.json()
-                
-                if not list_data.get("list"): return False, "列表为空", []
-                latest_meta = list_data["list"][0]
-                latest_id = latest_meta["id"]
-                version_name = latest_meta["name"]
+            session = self.http.session
+            # 1. 获取列表
+            list_url = f"https://gamekingapi.windoent.com/forbidden/forbbidengroup/webList?type={api_type}"
+            async with session.get(list_url, headers=headers, ssl=False) as resp:
+                if resp.status != 200: return False, f"列表请求失败 {resp.status}", []
+                list_data = await resp.json()
+            
+            if not list_data.get("list"): return False, "列表为空", []
+            latest_meta = list_data["list"][0]
+            latest_id = latest_meta["id"]
+            version_name = latest_meta["name"]
 
-                # 2. 获取详情
-                detail_url = f"https://gamekingapi.windoent.com/forbidden/forbbidengroup/webinfo/{latest_id}"
-                async with session.get(detail_url, ssl=False) as resp:
-                    if resp.status != 200: return False, f"详情请求失败 {resp.status}", []
-                    detail_data = await resp.json()
+            # 2. 获取详情
+            detail_url = f"https://gamekingapi.windoent.com/forbidden/forbbidengroup/webinfo/{latest_id}"
+            async with session.get(detail_url, headers=headers, ssl=False) as resp:
+                if resp.status != 200: return False, f"详情请求失败 {resp.status}", []
+                detail_data = await resp.json()
 
             # 3. 解析
             new_cards = {}
@@ -233,7 +244,16 @@ class BanlistManager:
                     card_code = self.name_map.get(jp_name) or self.name_map.get(en_name)
                     
                     if not card_code:
-                        # 没缓存，查百鸽
+                        # 没缓存，先查本地名称索引
+                        local = card_searcher.resolve_name(jp_name) or (
+                            card_searcher.resolve_name(en_name) if en_name else None
+                        )
+                        if local:
+                            card_code = str(local["id"])
+                            self.name_map[jp_name] = card_code
+
+                    if not card_code:
+                        # 本地也没有，查百鸽
                         search_res = await card_searcher.search_card(jp_name)
                         if not search_res.get("result") and en_name:
                             search_res = await card_searcher.search_card(en_name)
@@ -294,7 +314,7 @@ class BanlistManager:
             "genesys": points
         }
 
-    def check_deck_legality(self, env: str, main: List[str], extra: List[str], side: List[str]) -> Dict:
+    def check_deck_legality(self, env: str, deck: Deck) -> Dict:
         """全面检查卡组 (含Genesys)"""
         result = {
             "banlist_issues": [],
@@ -302,9 +322,8 @@ class BanlistManager:
             "genesys_details": []
         }
         
-        all_cards = main + extra + side
-        from collections import Counter
-        counts = Counter(all_cards)
+        # 卡组自带按卡密合计的张数 (主 + 额外 + 副)
+        counts = deck.counts
         
         # 1. 检查禁限表
         cards_map = self.banlist_data.get(env, {}).get("cards", {})
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+卡组变体批量模拟 (多核)
+- 每个变体的模拟拆成若干独立分块，分块种子由 SeedSequence.spawn 派生，结果与并行度无关
+- 分块在进程池中执行，进程池不可用时回退到线程池
+- 按回合统计：第 t 回合已见卡数 = 起手张数 + (t - 1)
+"""
+import asyncio
+import math
+from typing import Dict, List, Optional, Sequence
+
+from .hand_probability import HAS_NUMPY, BATCH_SIZE, HandGroup, encode_deck, partial_shuffle, wilson_interval
+
+if HAS_NUMPY:
+    import numpy as np
+
+CHUNK_TRIALS = 250_000
+
+
+class DeckVariant:
+    """参与对比的一个卡组版本"""
+
+    __slots__ = ("name", "main")
+
+    def __init__(self, name: str, main: Sequence[str]):
+        self.name = name
+        self.main = list(main)
+
+
+def run_chunk(
+    main: List[str],
+    groups: List[HandGroup],
+    hand_size: int,
+    turns: int,
+    trials: int,
+    seed,
+) -> List[int]:
+    """[子进程入口] 模拟 trials 局，返回每回合同时满足所有卡组的局数"""
+    deck, tables = encode_deck(main, groups)
+    depth = min(hand_size + turns - 1, len(deck))
+    mins = [g.min_count for g in groups]
+    rng = np.random.default_rng(seed)
+
+    hits = [0] * turns
+    done = 0
+    while done < trials:
+        n = min(BATCH_SIZE, trials - done)
+        top = partial_shuffle(rng, deck, n, depth)
+        # 各组在“前 k 张”中的累计张数
+        counts = [np.cumsum(table[top], axis=1, dtype=np.int16) for table in tables]
+        for t in range(turns):
+            seen = min(hand_size + t, depth)
+            ok = np.ones(n, dtype=bool)
+            for c, need in zip(counts, mins):
+                ok &= c[:, seen - 1] >= need
+            hits[t] += int(ok.sum())
+        done += n
+    return hits
+
+
+class BatchSimulator:
+    """
+    卡组变体对比
+    pool 为 RenderPool (进程池封装)，未启用或分块失败时在线程池中执行该分块
+    """
+
+    def __init__(self, pool, chunk_trials: int = CHUNK_TRIALS):
+        self.pool = pool
+        self.chunk_trials = chunk_trials
+
+    async def _run(self, *args) -> List[int]:
+        hits = None
+        if self.pool.enabled:
+            hits = await self.pool.submit(run_chunk, *args)
+        if hits is None:
+            loop = asyncio.get_running_loop()
+            hits = await loop.run_in_executor(None, run_chunk, *args)
+        return hits
+
+    async def compare(
+        self,
+        variants: List[DeckVariant],
+        groups: List[HandGroup],
+        hand_size: int = 5,
+        turns: int = 1,
+        trials: int = 1_000_000,
+        seed: Optional[int] = None,
+    ) -> Dict:
+        """
+        对比多个卡组变体
+        返回: { "seed": 可复现的种子, "trials": 每个变体的模拟局数,
+               "variants": [{ "name", "deck_size", "turns": [{ "rate", "ci" }, ...] }] }
+        """
+        if not HAS_NUMPY:
+            raise RuntimeError("批量模拟需要安装 numpy")
+
+        root = np.random.SeedSequence(seed)
+        n_chunks = max(1, math.ceil(trials / self.chunk_trials))
+        jobs = []
+        for variant, variant_seed in zip(variants, root.spawn(len(variants))):
+            for i, chunk_seed in enumerate(variant_seed.spawn(n_chunks)):
+                chunk = min(self.chunk_trials, trials - i * self.chunk_trials)
+                jobs.append(self._run(variant.main, groups, hand_size, turns, chunk, chunk_seed))
+        # gather 按提交顺序返回，合并结果与完成顺序无关
+        results = await asyncio.gather(*jobs)
+
+        report = []
+        for v_idx, variant in enumerate(variants):
+            hits = [0] * turns
+            for chunk_hits in results[v_idx * n_chunks:(v_idx + 1) * n_chunks]:
+                hits = [a + b for a, b in zip(hits, chunk_hits)]
+            report.append({
+                "name": variant.name,
+                "deck_size": len(variant.main),
+                "turns": [
+                    {"rate": h / trials, "ci": wilson_interval(h, trials)}
+                    for h in hits
+                ],
+            })
+        return {"seed": root.entropy, "trials": trials, "variants": report}
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+百鸽详情页提取基准 (card_page_parser vs 旧版正则)
+
+用法 (在插件目录下):
+    python benchmarks/bench_card_page_parser.py
+    python benchmarks/bench_card_page_parser.py --write-fixtures   # 重新生成 fixtures/*.html
+
+fixtures 为合成页面 (结构仿照 ygocdb.com 卡片页，文本随机)，不含真实页面内容。
+单次扫描的收益在于可以边下载边解析 (不必先拿到完整页面) 以及没有最坏情况；
+完整页面的解析耗时与旧正则基本持平，小页面略慢。
+缺少 div.info 的页面上旧正则的 qabox.*? 会对每个裁定框扫到页尾 (平方级)，且提取不到任何裁定。
+"""
+import codecs
+import html
+import os
+import random
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "fixtures")
+sys.path.insert(0, os.path.dirname(HERE))
+
+from card_page_parser import CardPageParser, parse_card_page  # noqa: E402
+
+# (文件名, 卡盒数, 裁定数, 是否去掉 div.info)
+FIXTURES = [
+    ("small.html", 5, 2, False),
+    ("typical.html", 20, 30, False),
+    ("heavy.html", 40, 150, False),
+    ("typical_no_info.html", 20, 30, True),
+]
+
+
+# ---------- 旧版正则提取 (对照组) ----------
+
+def _clean_html(raw_html):
+    if not raw_html:
+        return ""
+    text = re.sub(r"<br\s*/?>", "\n", raw_html, flags=re.IGNORECASE)
+    text = re.sub(r"<[^>]+>", "", text)
+    return html.unescape(text).strip()
+
+
+_PACK_RE = re.compile(
+    r'<li class="pack">\s*<span>(.*?)</span><span>(.*?)</span>\s*<a[^>]*>(.*?)</a>', re.DOTALL
+)
+_QABOX_RE = re.compile(r'<div class="qabox.*?>(.*?)<div class="info">', re.DOTALL)
+
+
+def _qa_field(box, name):
+    m = re.search(rf'<div class="qa {name}"[^>]*>(.*?)</div>', box, re.DOTALL)
+    return m.group(1) if m else None
+
+
+def regex_extract(page):
+    packs = [f"[{d}] {c} - {html.unescape(n.strip())}" for d, c, n in _PACK_RE.findall(page)]
+    faq = []
+    for box in _QABOX_RE.findall(page):
+        title, q, a = _qa_field(box, "title"), _qa_field(box, "question"), _qa_field(box, "answer")
+        if q is not None and a is not None:
+            faq.append({
+                "title": _clean_html(title) if title is not None else "Q&A",
+                "q": _clean_html(q),
+                "a": _clean_html(a),
+            })
+    return packs, faq
+
+
+# ---------- 合成页面 ----------
+
+_ZH = "的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要她出也得里后自以会家可下而过天去能对小多然于心学"
+
+
+def make_page(rnd, n_packs, n_qa, no_info=False):
+    def zh(n):
+        return "".join(rnd.choice(_ZH) for _ in range(n))
+
+    parts = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>card</title>'
+        + "<script>var x=1;</script>" * 20
+        + '</head><body><div class="container">',
+        "<nav>" + '<a href="/x">link</a>' * 60 + "</nav>",
+        f'<div class="card"><div class="desc">{zh(300)}</div></div>',
+        '<div class="packs"><ul>',
+    ]
+    for i in range(n_packs):
+        parts.append(
+            f'<li class="pack">\n  <span>20{rnd.randint(10, 24)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}</span>'
+            f'<span>ABC-JP{i:03d}</span>\n  <a href="/pack/{i}">「{zh(6)}」&amp; Pack&#39;s {i}</a></li>'
+        )
+    parts.append('</ul></div><div class="qas">')
+    for i in range(n_qa):
+        parts.append(
+            f'<div class="qabox col-md-6" id="qa{i}"><div class="qa title" data-id="{i}">{zh(12)} &lt;{i}&gt;</div>'
+            f'<div class="qa question">{zh(80)}<br>{zh(40)}<br/><a href="/card/{i}">「{zh(5)}」</a>{zh(30)}</div>'
+            f'<div class="qa answer">{zh(120)}<br>{zh(60)}</div>'
+            f'<div class="info"><span>20{i % 24:02d}-01-01</span></div></div>'
+        )
+    parts.append(f"</div></div><footer>{zh(100)}</footer></body></html>")
+    page = "".join(parts)
+    if no_info:
+        page = page.replace('<div class="info">', '<div class="meta">')
+    return page
+
+
+def write_fixtures():
+    rnd = random.Random(1)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, n_packs, n_qa, no_info in FIXTURES:
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8", newline="\n") as f:
+            f.write(make_page(rnd, n_packs, n_qa, no_info))
+        print(f"已生成 {name}")
+
+
+# ---------- 计时 ----------
+
+def parse_streamed(data, chunk_size=16 * 1024):
+    """按块解码后 feed，模拟边下载边解析"""
+    parser = CardPageParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for i in range(0, len(data), chunk_size):
+        parser.feed(decoder.decode(data[i:i + chunk_size]))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.packs, parser.faq
+
+
+def timeit(func, *args, budget=0.5):
+    """重复执行约 budget 秒，返回单次耗时 (毫秒)"""
+    func(*args)
+    runs, start = 0, time.perf_counter()
+    while True:
+        func(*args)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return elapsed / runs * 1000
+
+
+def main():
+    if "--write-fixtures" in sys.argv:
+        write_fixtures()
+        return
+
+    print(f"{'fixture':24s} {'size':>6s} {'regex':>10s} {'single-pass':>12s} {'streamed':>10s}  faq(regex/new)")
+    for name, _, _, no_info in FIXTURES:
+        with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+            data = f.read()
+        page = data.decode("utf-8")
+
+        new = parse_card_page(page)
+        # 分块边界落在多字节字符 / 标签中间时结果应完全一致
+        for chunk_size in (7, 1000, 16 * 1024):
+            assert parse_streamed(data, chunk_size) == new, (name, chunk_size)
+        old = regex_extract(page)
+        if not no_info:
+            assert old == new, name
+
+        t_regex = timeit(regex_extract, page)
+        t_new = timeit(parse_card_page, page)
+        t_stream = timeit(parse_streamed, data)
+        print(
+            f"{name:24s} {len(data) // 1024:4d}KB {t_regex:8.2f}ms {t_new:10.2f}ms {t_stream:8.2f}ms"
+            f"  {len(old[1])}/{len(new[1])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+from astrbot.api.all import logger
+
+
+class CacheJanitor:
+    """
+    后台缓存清理任务
+    - 目录: 在线程池中 scandir 建立 (修改时间, 大小, 路径) 索引，先删过期文件，再按最旧优先压到容量预算以内
+    - 钩子: 在事件循环中执行的同步清理函数 (如 SQLite 索引过期查询)，返回清理条数
+    - 定期执行，指令处理中不再做任何清理
+    - 正在写入的 *.tmp 临时文件不清理，超过 TMP_GRACE 仍未替换的视为残留 (如进程崩溃) 直接删除
+    """
+
+    TMP_GRACE = 60 * 60
+
+    def __init__(self, interval: float = 30 * 60):
+        self.interval = interval
+        # [(名称, 目录, 最长保留秒数, 容量上限字节)]
+        self._dirs: List[Tuple[str, str, float, int]] = []
+        # [(名称, 清理函数)]
+        self._hooks: List[Tuple[str, Callable[[], int]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.freed_files = 0
+        self.freed_bytes = 0
+
+    def add_directory(self, name: str, path: str, max_age: float, max_bytes: int):
+        self._dirs.append((name, path, max_age, max_bytes))
+
+    def add_hook(self, name: str, func: Callable[[], int]):
+        self._hooks.append((name, func))
+
+    def start(self):
+        """启动后台任务 (没有运行中的事件循环时忽略，可稍后再次调用)"""
+        if self._task and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+        except RuntimeError:
+            self._task = None
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"CacheJanitor: 清理失败: {e}")
+            await asyncio.sleep(self.interval)
+
+    @classmethod
+    def _sweep_directory(cls, path: str, max_age: float, max_bytes: int) -> Tuple[int, int]:
+        """[线程池] 按过期时间与容量预算清理目录，返回 (删除文件数, 释放字节数)"""
+        if not os.path.isdir(path):
+            return 0, 0
+        now = time.time()
+        entries = []
+        for entry in os.scandir(path):
+            try:
+                if entry.is_file():
+                    st = entry.stat()
+                    mtime = st.st_mtime
+                    if entry.name.endswith(".tmp"):
+                        if now - mtime <= cls.TMP_GRACE:
+                            continue
+                        # 残留临时文件一律视为过期
+                        mtime = 0.0
+                    entries.append((mtime, st.st_size, entry.path))
+            except OSError:
+                continue
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        files = freed = 0
+        for mtime, size, file_path in entries:
+            if now - mtime <= max_age and total <= max_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total -= size
+            files += 1
+            freed += size
+        return files, freed
+
+    async def run_once(self) -> Dict[str, Tuple[int, int]]:
+        """执行一轮清理，返回 { 名称: (清理条数, 释放字节数) }"""
+        report: Dict[str, Tuple[int, int]] = {}
+        loop = asyncio.get_running_loop()
+
+        for name, path, max_age, max_bytes in self._dirs:
+            files, freed = await loop.run_in_executor(
+                None, self._sweep_directory, path, max_age, max_bytes
+            )
+            report[name] = (files, freed)
+            self.freed_files += files
+            self.freed_bytes += freed
+
+        for name, func in self._hooks:
+            try:
+                report[name] = (func(), 0)
+            except Exception as e:
+                logger.warning(f"CacheJanitor: {name} 清理失败: {e}")
+
+        self.runs += 1
+        freed_parts = [
+            f"{name} {count} 项" + (f" ({size / 1024 / 1024:.1f}MB)" if size else "")
+            for name, (count, size) in report.items()
+            if count
+        ]
+        if freed_parts:
+            logger.info(f"CacheJanitor: 已清理 {', '.join(freed_parts)}")
+        return report
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "runs": self.runs,
+            "freed_files": self.freed_files,
+            "freed_bytes": self.freed_bytes,
+        }
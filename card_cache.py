@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import sqlite3
+from typing import Any, Dict, Optional
+from astrbot.api.all import logger
+
+from .ttl_cache import TTLCache
+
+
+class CardDetailCache:
+    """
+    卡片详情两级缓存 (内存 LRU + 磁盘 SQLite)
+    - 内存层: 热门卡片 (灰流丽、增殖的G...) 亚毫秒命中
+    - 磁盘层: 重启后依然有效，按最近访问时间淘汰
+    - 访问时间先记在内存，由 maintain() (后台清理任务) 或淘汰前批量写回，读取时不写盘
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        memory_size: int = 2048,
+        ttl: float = 7 * 24 * 60 * 60,
+        disk_max_entries: int = 30000,
+    ):
+        self.db_path = os.path.join(data_dir, "card_detail_cache.db")
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self._writes_since_evict = 0
+        # { 卡密: 最近访问时间 }，尚未写回磁盘
+        self._accessed: Dict[str, float] = {}
+
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS card_detail ("
+                " card_id TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_card_detail_accessed"
+                " ON card_detail (accessed_at)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            # 磁盘层不可用时退化为纯内存缓存
+            logger.warning(f"CardDetailCache: 磁盘缓存初始化失败，仅使用内存缓存: {e}")
+            self._conn = None
+
+    def get(self, card_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存，未命中返回 None
+        返回的 dict 与缓存共用同一对象，调用方只读，不要修改
+        """
+        card_id = str(card_id)
+        detail = self.memory.get(card_id)
+        if detail is not None:
+            if self._conn:
+                self._accessed[card_id] = time.time()
+            return detail
+
+        if not self._conn:
+            return None
+
+        try:
+            row = self._conn.execute(
+                "SELECT payload, fetched_at FROM card_detail WHERE card_id = ?",
+                (card_id,),
+            ).fetchone()
+            now = time.time()
+            if not row or now - row[1] > self.ttl:
+                self.disk_misses += 1
+                return None
+
+            detail = json.loads(row[0])
+        except Exception as e:
+            logger.warning(f"CardDetailCache: 读取磁盘缓存失败 {card_id}: {e}")
+            return None
+
+        self.disk_hits += 1
+        self._accessed[card_id] = now
+        # 回填内存层，剩余寿命按磁盘记录计算
+        self.memory.set(card_id, detail, ttl=max(self.ttl - (now - row[1]), 1))
+        return detail
+
+    def set(self, card_id: str, detail: Dict[str, Any]):
+        """写入两级缓存"""
+        card_id = str(card_id)
+        self.memory.set(card_id, detail)
+
+        if not self._conn:
+            return
+        try:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO card_detail VALUES (?, ?, ?, ?)",
+                (card_id, json.dumps(detail, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+
+            # 每写入一批检查一次容量，避免每次都 COUNT
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 100:
+                self._writes_since_evict = 0
+                self._evict_disk()
+        except Exception as e:
+            logger.warning(f"CardDetailCache: 写入磁盘缓存失败 {card_id}: {e}")
+
+    def _flush_access(self):
+        """把内存中记录的访问时间批量写回磁盘 (不提交)"""
+        if not self._accessed:
+            return
+        self._conn.executemany(
+            "UPDATE card_detail SET accessed_at = ? WHERE card_id = ?",
+            [(at, card_id) for card_id, at in self._accessed.items()],
+        )
+        self._accessed.clear()
+
+    def _evict_disk(self) -> int:
+        """写回访问时间后，按最近访问时间淘汰超出容量及过期的条目，返回删除条数"""
+        self._flush_access()
+        removed = self._conn.execute(
+            "DELETE FROM card_detail WHERE fetched_at < ?", (time.time() - self.ttl,)
+        ).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM card_detail").fetchone()[0]
+        overflow = count - self.disk_max_entries
+        if overflow > 0:
+            removed += self._conn.execute(
+                "DELETE FROM card_detail WHERE card_id IN ("
+                " SELECT card_id FROM card_detail ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        self._conn.commit()
+        return removed
+
+    def maintain(self) -> int:
+        """[后台清理钩子] 写回访问时间并淘汰磁盘条目，返回删除条数"""
+        if not self._conn:
+            return 0
+        try:
+            return self._evict_disk()
+        except Exception as e:
+            logger.warning(f"CardDetailCache: 磁盘缓存维护失败: {e}")
+            return 0
+
+    def invalidate(self, card_id: Optional[str] = None):
+        """失效单张卡片，不传参数则清空全部 (禁卡表 / Genesys 刷新时调用)"""
+        if card_id is None:
+            self.memory.clear()
+            self._accessed.clear()
+        else:
+            self.memory.pop(str(card_id))
+            self._accessed.pop(str(card_id), None)
+
+        if not self._conn:
+            return
+        try:
+            if card_id is None:
+                self._conn.execute("DELETE FROM card_detail")
+            else:
+                self._conn.execute(
+                    "DELETE FROM card_detail WHERE card_id = ?", (str(card_id),)
+                )
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"CardDetailCache: 清理磁盘缓存失败: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        stats = self.memory.stats()
+        stats.update({"disk_hits": self.disk_hits, "disk_misses": self.disk_misses})
+        return stats
+
+    def close(self):
+        if self._conn:
+            try:
+                self._flush_access()
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"CardDetailCache: 写回访问时间失败: {e}")
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from astrbot.api.all import logger
+
+
+class CardDatabase:
+    """
+    本地离线卡片数据库 (SQLite)
+    数据来源为百鸽全卡导出 (cards.json)，结构与 /api/v0/card/{id} 返回一致
+    """
+
+    # 参与名称索引的字段
+    NAME_FIELDS = ("cn_name", "sc_name", "md_name", "en_name", "jp_name")
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.card_count = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._create_tables(self._conn)
+            self.card_count = self._conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+            if self.card_count:
+                logger.info(f"CardDatabase: 已加载本地卡库 ({self.card_count} 张)")
+        except Exception as e:
+            logger.warning(f"CardDatabase: 本地卡库不可用: {e}")
+            self._conn = None
+
+    @property
+    def available(self) -> bool:
+        """本地卡库是否已导入数据"""
+        return self._conn is not None and self.card_count > 0
+
+    def _create_tables(self, conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cards ("
+            " id INTEGER PRIMARY KEY,"
+            " cn_name TEXT, sc_name TEXT, md_name TEXT, en_name TEXT, jp_name TEXT,"
+            " payload TEXT NOT NULL)"
+        )
+        conn.commit()
+
+    def import_dump(self, dump_path: str) -> int:
+        """
+        [同步方法] 导入全卡数据，供 run_in_executor 调用
+        支持 { "id": {...} } 字典或 [{...}, ...] 列表两种格式
+        返回导入的卡片数量
+        """
+        with open(dump_path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        cards = raw.values() if isinstance(raw, dict) else raw
+
+        rows = []
+        for card in cards:
+            if not isinstance(card, dict) or not card.get("id"):
+                continue
+            rows.append((
+                int(card["id"]),
+                *(card.get(field) or "" for field in self.NAME_FIELDS),
+                json.dumps(card, ensure_ascii=False),
+            ))
+
+        # 导入在线程池中执行，使用独立连接，整体替换为一个事务
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self._create_tables(conn)
+            with conn:
+                conn.execute("DELETE FROM cards")
+                conn.executemany("INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+        self.card_count = len(rows)
+        logger.info(f"CardDatabase: 从 {os.path.basename(dump_path)} 导入 {len(rows)} 张卡片")
+        return len(rows)
+
+    def get(self, card_id: str) -> Optional[Dict[str, Any]]:
+        """按卡密读取详情，不存在返回 None"""
+        if not self.available or not str(card_id).isdigit():
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT payload FROM cards WHERE id = ?", (int(card_id),)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            logger.warning(f"CardDatabase: 读取 {card_id} 失败: {e}")
+            return None
+
+    def get_many(self, card_ids: List[int]) -> List[Dict[str, Any]]:
+        """批量读取详情，保持传入顺序，缺失的卡密会被跳过"""
+        if not self.available or not card_ids:
+            return []
+        try:
+            placeholders = ",".join("?" * len(card_ids))
+            rows = self._conn.execute(
+                f"SELECT id, payload FROM cards WHERE id IN ({placeholders})",
+                [int(cid) for cid in card_ids],
+            ).fetchall()
+        except Exception as e:
+            logger.warning(f"CardDatabase: 批量读取失败: {e}")
+            return []
+        by_id = {row[0]: row[1] for row in rows}
+        return [json.loads(by_id[int(cid)]) for cid in card_ids if int(cid) in by_id]
+
+    def iter_names(self) -> Iterator[Tuple[int, Tuple[str, ...]]]:
+        """遍历 (卡密, 各语言名称)，用于构建名称索引"""
+        if not self.available:
+            return
+        columns = ", ".join(self.NAME_FIELDS)
+        for row in self._conn.execute(f"SELECT id, {columns} FROM cards"):
+            yield row[0], row[1:]
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
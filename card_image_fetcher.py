@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import time
+import asyncio
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from astrbot.api.all import logger
+
+
+class _HostStats:
+    __slots__ = ("requests", "ok", "failures", "retries", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.ok = 0
+        self.failures = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency: float, ok: bool):
+        self.requests += 1
+        if ok:
+            self.ok += 1
+        else:
+            self.failures += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "ok": self.ok,
+            "failures": self.failures,
+            "retries": self.retries,
+            "avg_ms": int(self.latency_total * 1000 / self.requests) if self.requests else 0,
+            "max_ms": int(self.latency_max * 1000),
+        }
+
+
+class CardImageFetcher:
+    """
+    卡图下载服务 (缩略图磁盘缓存 -> CDN)
+    - 请求合并: 同一卡密正在下载时，后来的请求直接等待同一个任务，不重复下载
+    - 并发限制: 每个主机一个信号量，绘图突发时不会一次性打满 CDN
+    - 重试: 超时 / 连接错误 / 429 / 5xx 按指数退避重试，404 直接放弃
+    - 统计: 按主机记录请求数、失败数、重试数与延迟
+    """
+
+    URL_TEMPLATE = "https://cdn.233.momobako.com/ygopro/pics/{card_id}.jpg!thumb2"
+
+    def __init__(
+        self,
+        http,
+        cache,
+        per_host_limit: int = 6,
+        retries: int = 2,
+        backoff: float = 0.5,
+        timeout: float = 10,
+    ):
+        self.http = http  # 插件共享的 HttpClient
+        self.cache = cache  # ThumbnailCache
+        self.per_host_limit = max(1, per_host_limit)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        # { 卡密: 下载任务 }
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # { 主机: 信号量 } (在事件循环中懒创建)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._hosts: Dict[str, _HostStats] = {}
+        self.coalesced = 0
+
+    async def fetch(self, card_id: str) -> Optional[bytes]:
+        """获取卡图原始字节，失败返回 None"""
+        card_id = str(card_id)
+        data = await self.cache.get(card_id)
+        if data:
+            return data
+
+        task = self._inflight.get(card_id)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.get_running_loop().create_task(self._fetch_and_store(card_id))
+            self._inflight[card_id] = task
+            task.add_done_callback(lambda _t, cid=card_id: self._inflight.pop(cid, None))
+        # shield: 某个请求方被取消时不影响其他等待同一张图的请求
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, card_id: str) -> Optional[bytes]:
+        data = await self._download(self.URL_TEMPLATE.format(card_id=card_id))
+        if data:
+            await self.cache.put(card_id, data)
+        return data
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(host)
+        if sem is None:
+            sem = self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return sem
+
+    async def _download(self, url: str) -> Optional[bytes]:
+        host = urlsplit(url).netloc
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = _HostStats()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                stats.retries += 1
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+            async with self._semaphore(host):
+                start = time.monotonic()
+                try:
+                    async with self.http.session.get(url, timeout=timeout) as resp:
+                        if resp.status == 200:
+                            data = await resp.read()
+                            stats.record(time.monotonic() - start, True)
+                            return data
+                        stats.record(time.monotonic() - start, False)
+                        # 只有限流与服务端错误值得重试
+                        if resp.status != 429 and resp.status < 500:
+                            return None
+                        reason = f"HTTP {resp.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    stats.record(time.monotonic() - start, False)
+                    reason = type(e).__name__
+                except Exception as e:
+                    # 非网络错误 (如 Session 已关闭) 重试也无意义，记一次失败后直接放弃
+                    stats.record(time.monotonic() - start, False)
+                    logger.warning(f"CardImageFetcher: 下载出错 {url}: {e}")
+                    return None
+            logger.debug(f"CardImageFetcher: {url} 第 {attempt + 1} 次请求失败 ({reason})")
+
+        logger.warning(f"CardImageFetcher: 下载失败 {url} ({reason})")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "hosts": {host: st.to_dict() for host, st in self._hosts.items()},
+        }
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class CardNameIndex:
+    """
+    本地多语言卡名索引 (中/英/日)
+    - 精确表: 规范化名称 -> 卡密
+    - 二元组倒排表: 支持 "青眼" 这类中文片段查询
+    所有 名称 -> ID 的解析都在内存中完成，无需请求百鸽 API
+    """
+
+    # 规范化时去掉的字符 (空白与常见分隔符)
+    _STRIP_RE = re.compile(r"[\s·・\-‐－_'\"“”「」]+")
+
+    def __init__(self):
+        self.exact: Dict[str, List[int]] = defaultdict(list)
+        self.bigrams: Dict[str, Set[int]] = defaultdict(set)
+        self.names: Dict[int, List[str]] = {}
+
+    @classmethod
+    def normalize(cls, name: str) -> str:
+        """全角转半角 + 忽略大小写 + 去分隔符"""
+        text = unicodedata.normalize("NFKC", name or "").casefold()
+        return cls._STRIP_RE.sub("", text)
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def build(self, entries: Iterable[Tuple[int, Iterable[str]]]):
+        """由 (卡密, [各语言名称]) 序列构建索引，会覆盖旧数据"""
+        self.exact.clear()
+        self.bigrams.clear()
+        self.names.clear()
+
+        for card_id, raw_names in entries:
+            names = []
+            for raw in raw_names:
+                norm = self.normalize(raw)
+                if norm and norm not in names:
+                    names.append(norm)
+            if not names:
+                continue
+
+            self.names[card_id] = names
+            for norm in names:
+                if card_id not in self.exact[norm]:
+                    self.exact[norm].append(card_id)
+                for gram in self._grams(norm):
+                    self.bigrams[gram].add(card_id)
+
+    def lookup(self, query: str, k: int = 10) -> List[int]:
+        """
+        按相关度返回前 k 个卡密
+        排序: 完全匹配 > 前缀匹配 > 包含匹配，同级按名称长度升序
+        """
+        norm = self.normalize(query)
+        if not norm or not self.names:
+            return []
+
+        grams = self._grams(norm)
+        if grams:
+            # 从最短的倒排表开始求交集
+            postings = sorted((self.bigrams.get(g, set()) for g in grams), key=len)
+            candidates = set(postings[0])
+            for p in postings[1:]:
+                candidates &= p
+                if not candidates:
+                    break
+        else:
+            # 单字查询没有二元组，退化为全表扫描
+            candidates = self.names.keys()
+
+        scored = []
+        for card_id in candidates:
+            best = None
+            for name in self.names[card_id]:
+                if name == norm:
+                    rank = (0, len(name))
+                elif name.startswith(norm):
+                    rank = (1, len(name))
+                elif norm in name:
+                    rank = (2, len(name))
+                else:
+                    continue
+                if best is None or rank < best:
+                    best = rank
+            if best is not None:
+                scored.append((best, card_id))
+
+        scored.sort()
+        return [card_id for _, card_id in scored[:k]]
+
+    def resolve(self, name: str) -> Optional[int]:
+        """名称 -> 卡密，取相关度最高的一张，找不到返回 None"""
+        norm = self.normalize(name)
+        if norm in self.exact:
+            return self.exact[norm][0]
+        top = self.lookup(name, k=1)
+        return top[0] if top else None
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class CardPage:
+    """一张卡片的百鸽详情页解析结果 (卡盒 + 裁定) 及其校验信息"""
+
+    __slots__ = ("packs", "faq", "etag", "last_modified", "checked_at")
+
+    def __init__(
+        self,
+        packs: List[str],
+        faq: List[Dict[str, str]],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        self.packs = packs
+        self.faq = faq
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked_at = time.monotonic()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """重新验证用的条件请求头"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CardPageCache:
+    """
+    详情页解析结果缓存 (按卡密，内存 LRU)
+    - ttl 内直接返回，不联网
+    - 过期后保留条目用于条件请求 (ETag / Last-Modified)，304 时只刷新校验时间
+    - 网络失败时调用方可继续使用过期条目
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 6 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, CardPage]" = OrderedDict()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.refetched = 0
+        self.misses = 0
+
+    def get(self, card_id: str) -> Optional[CardPage]:
+        """返回缓存条目 (可能已过期，用 is_fresh 判断)"""
+        page = self._data.get(card_id)
+        if page is not None:
+            self._data.move_to_end(card_id)
+        return page
+
+    def is_fresh(self, page: CardPage) -> bool:
+        return time.monotonic() - page.checked_at < self.ttl
+
+    def put(self, card_id: str, page: CardPage):
+        self._data[card_id] = page
+        self._data.move_to_end(card_id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def touch(self, card_id: str):
+        """304 Not Modified: 内容未变，重置过期计时"""
+        page = self._data.get(card_id)
+        if page is not None:
+            page.checked_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "refetched": self.refetched,
+            "misses": self.misses,
+        }
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+百鸽 (ygocdb.com) 卡片详情页提取器
+单次扫描：位置只前进不回退，一边接收 HTML 片段一边产出卡盒与裁定，不需要先拿到完整页面。
+扫描按状态切换要找的标签 (页面 / 裁定框 / 裁定字段 / 卡盒)，无关标签在 C 层的正则搜索中直接跳过
+"""
+import re
+import html
+from typing import Dict, List, Optional, Tuple
+
+# 各状态下关心的标签
+_TOP_RE = re.compile(r"<(div|li|script)\b([^>]*)>", re.IGNORECASE)
+_BOX_RE = re.compile(r"<(div|li)\b([^>]*)>", re.IGNORECASE)
+_FIELD_RE = re.compile(r"<(/?)(div|br)\b[^>]*>", re.IGNORECASE)
+_PACK_RE = re.compile(r"<(/?)(span|a|li)\b[^>]*>", re.IGNORECASE)
+_SCRIPT_END_RE = re.compile(r"</script", re.IGNORECASE)
+
+_CLASS_RE = re.compile(r"""class\s*=\s*["']([^"']*)["']""", re.IGNORECASE)
+_TAG_STRIP_RE = re.compile(r"<[^>]*>")
+
+# 扫描状态
+_TOP, _SCRIPT, _BOX, _FIELD, _PACK = range(5)
+
+# 裁定字段: div.qa.<字段> -> 输出键名
+_QA_FIELDS = {"title": "title", "question": "q", "answer": "a"}
+
+
+def _classes(attrs: str) -> List[str]:
+    m = _CLASS_RE.search(attrs)
+    return m.group(1).split() if m else []
+
+
+def _text(parts: List[str]) -> str:
+    """拼接片段，去掉残留标签 (如裁定里的卡名链接) 并反转义"""
+    return html.unescape(_TAG_STRIP_RE.sub("", "".join(parts))).strip()
+
+
+class CardPageParser:
+    """
+    可增量 feed() 的提取器，结果在 packs / faq 中累积
+    - 卡盒: <li class="pack"><span>日期</span><span>编号</span><a>包名</a></li>
+      -> "[日期] 编号 - 包名"
+    - 裁定: <div class="qabox ..."> 内的 div.qa.title / question / answer，遇到 div.info 结束
+      -> {"title", "q", "a"}，<br> 转为换行，其余标签去除
+    """
+
+    def __init__(self):
+        self.packs: List[str] = []
+        self.faq: List[Dict[str, str]] = []
+
+        self._mode = _TOP
+        # 未处理完的尾部 (可能是被分片截断的半个标签)
+        self._buf = ""
+        # 当前收集文本的目标 (None 表示不收集)
+        self._capture: Optional[List[str]] = None
+
+        # 当前卡盒: 已读到的 span 文本
+        self._pack: List[str] = []
+        self._pack_name = False
+        # 当前裁定框、正在收集的字段及字段内嵌套 div 的深度
+        self._box: Dict[str, str] = {}
+        self._field = ""
+        self._field_depth = 0
+
+    def feed(self, data: str):
+        buf = self._buf + data if self._buf else data
+        pos = 0
+        while True:
+            mode = self._mode
+            if mode == _SCRIPT:
+                m = _SCRIPT_END_RE.search(buf, pos)
+                if m is None:
+                    # 保留可能被截断的 "</scr"
+                    self._buf = buf[max(pos, len(buf) - 8):]
+                    return
+                pos = m.end()
+                self._mode = _TOP
+                continue
+
+            if mode == _TOP:
+                m = _TOP_RE.search(buf, pos)
+            elif mode == _BOX:
+                m = _BOX_RE.search(buf, pos)
+            elif mode == _FIELD:
+                m = _FIELD_RE.search(buf, pos)
+            else:
+                m = _PACK_RE.search(buf, pos)
+            if m is None:
+                break
+            if self._capture is not None and m.start() > pos:
+                self._capture.append(buf[pos:m.start()])
+            pos = m.end()
+
+            if mode == _TOP:
+                self._top_tag(m.group(1).lower(), m.group(2))
+            elif mode == _BOX:
+                self._box_tag(m.group(1).lower(), m.group(2))
+            elif mode == _FIELD:
+                self._field_tag(m.group(1) == "/", m.group(2).lower())
+            else:
+                self._pack_tag(m.group(1) == "/", m.group(2).lower())
+
+        # 末尾若有未闭合的 "<"，留到下一片再处理
+        tail = buf[pos:]
+        cut = tail.rfind("<")
+        if cut != -1 and ">" not in tail[cut:]:
+            self._buf = tail[cut:]
+            tail = tail[:cut]
+        else:
+            self._buf = ""
+        if self._capture is not None and tail:
+            self._capture.append(tail)
+
+    def close(self):
+        self._buf = ""
+        # 页面在裁定框中途结束时保留已完整读到的那一条
+        if self._mode in (_BOX, _FIELD):
+            self._finish_box()
+
+    # ---------- 各状态的标签处理 ----------
+
+    def _top_tag(self, tag: str, attrs: str):
+        if tag == "script":
+            if not attrs.rstrip().endswith("/"):
+                self._mode = _SCRIPT
+            return
+        classes = _classes(attrs)
+        if tag == "div":
+            if classes and classes[0].startswith("qabox"):
+                self._start_box()
+        elif "pack" in classes:
+            self._start_pack()
+
+    def _start_box(self):
+        self._box = {}
+        self._mode = _BOX
+
+    def _finish_box(self):
+        box = self._box
+        self._box = {}
+        self._capture = None
+        self._mode = _TOP
+        if "q" in box and "a" in box:
+            self.faq.append({"title": box.get("title", "Q&A"), "q": box["q"], "a": box["a"]})
+
+    def _box_tag(self, tag: str, attrs: str):
+        classes = _classes(attrs)
+        if tag == "li":
+            # 裁定框没有 div.info 就进入了卡盒列表
+            if "pack" in classes:
+                self._finish_box()
+                self._start_pack()
+            return
+        if not classes:
+            return
+        if classes[0].startswith("qabox"):
+            self._finish_box()
+            self._start_box()
+        elif "info" in classes:
+            self._finish_box()
+        elif "qa" in classes:
+            for cls in classes:
+                key = _QA_FIELDS.get(cls)
+                if key:
+                    self._field = key
+                    self._field_depth = 0
+                    self._capture = []
+                    self._mode = _FIELD
+                    break
+
+    def _field_tag(self, closing: bool, tag: str):
+        if tag == "br":
+            self._capture.append("\n")
+        elif not closing:
+            self._field_depth += 1
+        elif self._field_depth:
+            self._field_depth -= 1
+        else:
+            self._box[self._field] = _text(self._capture)
+            self._capture = None
+            self._mode = _BOX
+
+    def _start_pack(self):
+        self._pack = []
+        self._pack_name = False
+        self._mode = _PACK
+
+    def _pack_tag(self, closing: bool, tag: str):
+        if tag == "li":
+            if closing:
+                self._capture = None
+                self._mode = _TOP
+        elif tag == "span":
+            if not closing and len(self._pack) < 2:
+                self._capture = []
+            elif closing and self._capture is not None and not self._pack_name:
+                self._pack.append(_text(self._capture))
+                self._capture = None
+        elif not closing:
+            if len(self._pack) == 2:
+                self._pack_name = True
+                self._capture = []
+        elif self._pack_name:
+            date, code = self._pack
+            self.packs.append(f"[{date}] {code} - {_text(self._capture)}")
+            # 一个 li 只取一条，后续内容跳过
+            self._capture = None
+            self._mode = _TOP
+
+
+def parse_card_page(html_text: str) -> Tuple[List[str], List[Dict[str, str]]]:
+    """一次扫描完整 HTML，返回 (卡盒列表, 裁定列表)"""
+    parser = CardPageParser()
+    parser.feed(html_text)
+    parser.close()
+    return parser.packs, parser.faq
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import hashlib
+from array import array
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from .deck_codec import (
+    UINT32,
+    decode_ourocg,
+    decode_ydke,
+    encode_ourocg,
+    encode_ydke,
+    OUROCG_DECK_URL,
+)
+
+_UINT32_LIMIT = 1 << 32
+
+
+def _to_array(ids: Iterable) -> array:
+    if isinstance(ids, array) and ids.typecode == UINT32:
+        return ids
+    return array(UINT32, map(int, ids))
+
+
+class Deck:
+    """
+    卡组值类型 (不可变)
+    - 三个区域都是 uint32 数组，60 张卡只占几百字节，不再为每张卡创建字符串
+    - digest: 构造时计算的规范化哈希 (区域内排序后哈希)，卡片相同的卡组摘要相同，比较 / 去重为 O(1)
+    - 与 YDK 文本、ydke、Ourocg 之间直接转换
+    """
+
+    __slots__ = ("main", "extra", "side", "digest", "_counts")
+
+    def __init__(self, main: Iterable = (), extra: Iterable = (), side: Iterable = ()):
+        self.main = _to_array(main)
+        self.extra = _to_array(extra)
+        self.side = _to_array(side)
+        self._counts: Optional[Counter] = None
+
+        h = hashlib.sha1()
+        for section in (self.main, self.extra, self.side):
+            h.update(len(section).to_bytes(2, "little"))
+            h.update(array(UINT32, sorted(section)).tobytes())
+        self.digest = h.hexdigest()
+
+    # ---------- 基本协议 ----------
+
+    def __bool__(self) -> bool:
+        """主卡组或额外卡组非空即视为有效卡组"""
+        return bool(self.main) or bool(self.extra)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Deck) and self.digest == other.digest
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __repr__(self) -> str:
+        return f"Deck(M:{len(self.main)} E:{len(self.extra)} S:{len(self.side)} {self.digest[:8]})"
+
+    @property
+    def counts(self) -> Counter:
+        """{ 卡密(int): 三个区域合计张数 }"""
+        if self._counts is None:
+            counts = Counter(self.main)
+            counts.update(self.extra)
+            counts.update(self.side)
+            self._counts = counts
+        return self._counts
+
+    def summary(self) -> str:
+        return f"M:{len(self.main)} E:{len(self.extra)} S:{len(self.side)}"
+
+    # 绘图 / 卡图缓存等以字符串卡密为键的地方按需转换
+    def main_ids(self) -> List[str]:
+        return list(map(str, self.main))
+
+    def extra_ids(self) -> List[str]:
+        return list(map(str, self.extra))
+
+    def side_ids(self) -> List[str]:
+        return list(map(str, self.side))
+
+    # ---------- YDK 文本 ----------
+
+    @classmethod
+    def from_ydk(cls, text: str) -> "Deck":
+        """解析 YDK 文本 (#main / #extra / !side)"""
+        sections = {"main": array(UINT32), "extra": array(UINT32), "side": array(UINT32)}
+        current = None
+        for line in text.splitlines():
+            line = line.strip()
+            if not line: continue
+            if line.startswith("#main"):
+                current = sections["main"]
+            elif line.startswith("#extra"):
+                current = sections["extra"]
+            elif line.startswith("!side"):
+                current = sections["side"]
+            elif line.startswith("#"):
+                continue
+            elif current is not None and line.isascii() and line.isdigit():
+                # 超出 uint32 的“卡密”与其他非法行一样跳过
+                card_id = int(line)
+                if card_id < _UINT32_LIMIT:
+                    current.append(card_id)
+        return cls(sections["main"], sections["extra"], sections["side"])
+
+    def to_ydk(self, creator: str = "DuelGalatea") -> str:
+        lines = [f"#created by {creator}", "#main"]
+        lines.extend(map(str, self.main))
+        lines.append("#extra")
+        lines.extend(map(str, self.extra))
+        lines.append("!side")
+        lines.extend(map(str, self.side))
+        lines.append("")
+        return "\n".join(lines)
+
+    # ---------- 分享码 ----------
+
+    @classmethod
+    def from_ydke(cls, url: str) -> "Deck":
+        return cls(*decode_ydke(url))
+
+    def to_ydke(self) -> str:
+        return encode_ydke(self.main, self.extra, self.side)
+
+    @classmethod
+    def from_ourocg(cls, encoded: str) -> "Deck":
+        data = decode_ourocg(encoded)
+        return cls(data["main"], data["extra"], data["side"])
+
+    def to_ourocg(self) -> str:
+        return encode_ourocg(self.main, self.extra, self.side)
+
+    def to_ourocg_url(self) -> str:
+        return OUROCG_DECK_URL + self.to_ourocg()
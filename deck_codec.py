@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+卡组分享码编解码 (纯函数，不依赖 AstrBot)
+
+Ourocg V1 (deck.ourygo.top 的 d 参数):
+  URL Safe Base64 -> 位流 (高位在前)
+  头部: 主卡组条目数(8) + 额外条目数(4) + 副卡组条目数(4)
+  条目: 数量(2) + 卡密(27)，共 29 位；同一卡密超过 3 张时拆成多条
+
+YDKe (ydke://主卡组!额外!副卡组!):
+  每段为标准 Base64，内容是小端序 uint32 卡密数组
+"""
+import sys
+import base64
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+OUROCG_DECK_URL = "https://deck.ourygo.top/?d="
+
+_ID_BITS = 27
+_COUNT_BITS = 2
+_ENTRY_BITS = _ID_BITS + _COUNT_BITS
+_ID_MASK = (1 << _ID_BITS) - 1
+_MAX_COPIES = (1 << _COUNT_BITS) - 1
+_HEADER = ((8, "main"), (4, "extra"), (4, "side"))
+
+YDKE_PREFIX = "ydke://"
+# 4 字节无符号整数的 array 类型码 (绝大多数平台为 "I")
+UINT32 = "I" if array("I").itemsize == 4 else "L"
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def _b64decode_urlsafe(data: str) -> bytes:
+    data = data.strip().replace("-", "+").replace("_", "/")
+    padding = len(data) % 4
+    if padding:
+        data += "=" * (4 - padding)
+    return base64.b64decode(data)
+
+
+def decode_ourocg(encoded: str) -> Dict[str, List[int]]:
+    """
+    解码 Ourocg d 参数，返回 {"main": [卡密...], "extra": [...], "side": [...]}
+    整段数据转成一个大整数后按位移读取，不再生成 “01” 字符串
+    """
+    data = _b64decode_urlsafe(encoded)
+    total_bits = len(data) * 8
+    if total_bits < 16:
+        return {"main": [], "extra": [], "side": []}
+    value = int.from_bytes(data, "big")
+
+    def read(offset: int, width: int) -> int:
+        return (value >> (total_bits - offset - width)) & ((1 << width) - 1)
+
+    counts = []
+    offset = 0
+    for width, _ in _HEADER:
+        counts.append(read(offset, width))
+        offset += width
+
+    deck: Dict[str, List[int]] = {}
+    for (_, section), count in zip(_HEADER, counts):
+        ids: List[int] = []
+        for _ in range(count):
+            if offset + _ENTRY_BITS > total_bits:
+                break
+            entry = read(offset, _ENTRY_BITS)
+            offset += _ENTRY_BITS
+            # 高 2 位是数量，低 27 位是卡密
+            ids.extend([entry & _ID_MASK] * (entry >> _ID_BITS))
+        deck[section] = ids
+    return deck
+
+
+def _group_entries(ids: Sequence) -> List[Tuple[int, int]]:
+    """按首次出现顺序合并同名卡，返回 [(数量, 卡密)]，每条最多 3 张"""
+    counts: Dict[int, int] = {}
+    for cid in ids:
+        card_id = int(cid)
+        if not 0 < card_id <= _ID_MASK:
+            raise ValueError(f"卡密超出 Ourocg 编码范围: {cid}")
+        counts[card_id] = counts.get(card_id, 0) + 1
+
+    entries = []
+    for card_id, count in counts.items():
+        while count > 0:
+            n = min(count, _MAX_COPIES)
+            entries.append((n, card_id))
+            count -= n
+    return entries
+
+
+def encode_ourocg(main: Sequence, extra: Sequence, side: Sequence) -> str:
+    """编码为 Ourocg d 参数 (URL Safe Base64，无填充)"""
+    sections = [_group_entries(main), _group_entries(extra), _group_entries(side)]
+
+    acc = 0
+    bits = 0
+    for (width, section), entries in zip(_HEADER, sections):
+        if len(entries) >= 1 << width:
+            raise ValueError(f"{section} 卡片种类过多，无法编码为 Ourocg 链接")
+        acc = (acc << width) | len(entries)
+        bits += width
+    for entries in sections:
+        for count, card_id in entries:
+            acc = (acc << _ENTRY_BITS) | (count << _ID_BITS) | card_id
+            bits += _ENTRY_BITS
+
+    # 末尾补 0 到整字节
+    pad = -bits % 8
+    acc <<= pad
+    data = acc.to_bytes((bits + pad) // 8, "big")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode_padded(data: str) -> bytes:
+    data = data.strip()
+    padding = len(data) % 4
+    if padding:
+        data += "=" * (4 - padding)
+    return base64.b64decode(data)
+
+
+def unpack_ids(data: bytes) -> array:
+    """小端序 uint32 字节串 -> 卡密数组 (frombytes 一次拷入，不逐个 unpack)"""
+    ids = array(UINT32)
+    # 末尾不足 4 字节的残缺数据直接忽略
+    ids.frombytes(memoryview(data)[: len(data) - len(data) % 4])
+    if _BIG_ENDIAN:
+        ids.byteswap()
+    return ids
+
+
+def pack_ids(ids: Sequence) -> bytes:
+    """卡密 (字符串 / 整数 / uint32 数组) -> 小端序 uint32 字节串"""
+    arr = ids if isinstance(ids, array) and ids.typecode == UINT32 else array(UINT32, map(int, ids))
+    if _BIG_ENDIAN:
+        arr = array(UINT32, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def decode_ydke_section(encoded: str) -> array:
+    """解码 YDKe 的一段为 uint32 数组"""
+    if not encoded:
+        return array(UINT32)
+    return unpack_ids(_b64decode_padded(encoded))
+
+
+def decode_ydke(url: str) -> Tuple[array, array, array]:
+    """解码 ydke:// 链接，返回 (主卡组, 额外, 副卡组) 三个 uint32 数组"""
+    body = url.strip()
+    if body.startswith(YDKE_PREFIX):
+        body = body[len(YDKE_PREFIX):]
+    parts = body.split("!")
+    parts += [""] * (3 - len(parts))
+    return (
+        decode_ydke_section(parts[0]),
+        decode_ydke_section(parts[1]),
+        decode_ydke_section(parts[2]),
+    )
+
+
+def encode_ydke_section(ids: Sequence) -> str:
+    return base64.b64encode(pack_ids(ids)).decode("ascii")
+
+
+def encode_ydke(main: Sequence, extra: Sequence, side: Sequence) -> str:
+    """编码为 ydke:// 链接 (卡密可为字符串或整数)"""
+    return f"{YDKE_PREFIX}{encode_ydke_section(main)}!{encode_ydke_section(extra)}!{encode_ydke_section(side)}!"
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, Optional
+from astrbot.api.all import logger
+
+from .deck import Deck
+from .deck_codec import pack_ids, unpack_ids
+
+
+class DeckStore:
+    """
+    会话卡组存储 (SQLite)
+    - decks: 按内容寻址的卡组数据 (三个区域的小端序 uint32 字节串)，相同卡组只存一份
+    - session_decks: 会话 -> 卡组 的指针，转存 / 分享只需更新指针
+    - 读取经过内存 LRU；过期清理按 updated_at 索引删除，不再扫描目录
+    """
+
+    def __init__(self, data_dir: str, cache_size: int = 256):
+        self.db_path = os.path.join(data_dir, "deck_store.db")
+        self.cache_size = cache_size
+        # { session_id: Deck }，末尾为最近使用
+        self._cache: "OrderedDict[str, Deck]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS decks ("
+                " content_key TEXT PRIMARY KEY,"
+                " main BLOB NOT NULL,"
+                " extra BLOB NOT NULL,"
+                " side BLOB NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_decks ("
+                " session_id TEXT PRIMARY KEY,"
+                " content_key TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_session_decks_updated"
+                " ON session_decks (updated_at)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            # 数据库不可用时卡组仅保存在内存中 (重启后丢失)
+            logger.warning(f"DeckStore: 初始化失败，卡组仅保存在内存中: {e}")
+            self._conn = None
+
+    @staticmethod
+    def _content_key(main: bytes, extra: bytes, side: bytes) -> str:
+        # 与 Deck.digest 不同，这里保留卡片顺序 (顺序影响构筑图)
+        h = hashlib.sha1()
+        for blob in (main, extra, side):
+            h.update(len(blob).to_bytes(4, "little"))
+            h.update(blob)
+        return h.hexdigest()
+
+    def _remember(self, session_id: str, deck: Deck):
+        self._cache[session_id] = deck
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def put(self, session_id: str, deck: Deck, updated_at: Optional[float] = None) -> bool:
+        """保存会话卡组"""
+        self._remember(session_id, deck)
+        if not self._conn:
+            return True
+        blobs = (pack_ids(deck.main), pack_ids(deck.extra), pack_ids(deck.side))
+        key = self._content_key(*blobs)
+        try:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO decks (content_key, main, extra, side) VALUES (?, ?, ?, ?)",
+                (key, *blobs),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session_decks (session_id, content_key, updated_at) VALUES (?, ?, ?)",
+                (session_id, key, updated_at or time.time()),
+            )
+            self._conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"DeckStore: 保存卡组失败 {session_id}: {e}")
+            return False
+
+    def get(self, session_id: str) -> Optional[Deck]:
+        """读取会话卡组，不存在返回 None"""
+        deck = self._cache.get(session_id)
+        if deck is not None:
+            self._cache.move_to_end(session_id)
+            self.hits += 1
+            return deck
+        self.misses += 1
+        if not self._conn:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT d.main, d.extra, d.side FROM session_decks s"
+                " JOIN decks d ON d.content_key = s.content_key"
+                " WHERE s.session_id = ?",
+                (session_id,),
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"DeckStore: 读取卡组失败 {session_id}: {e}")
+            return None
+        if not row:
+            return None
+        deck = Deck(unpack_ids(row[0]), unpack_ids(row[1]), unpack_ids(row[2]))
+        self._remember(session_id, deck)
+        return deck
+
+    def has(self, session_id: str) -> bool:
+        if session_id in self._cache:
+            return True
+        if not self._conn:
+            return False
+        try:
+            return self._conn.execute(
+                "SELECT 1 FROM session_decks WHERE session_id = ?", (session_id,)
+            ).fetchone() is not None
+        except Exception:
+            return False
+
+    def copy(self, src_session_id: str, target_session_id: str) -> bool:
+        """将源会话的卡组指向目标会话 (只更新指针，不复制卡组数据)"""
+        if not self._conn:
+            deck = self._cache.get(src_session_id)
+            if deck is None:
+                return False
+            self._remember(target_session_id, deck)
+            return True
+        try:
+            cur = self._conn.execute(
+                "INSERT OR REPLACE INTO session_decks (session_id, content_key, updated_at)"
+                " SELECT ?, content_key, ? FROM session_decks WHERE session_id = ?",
+                (target_session_id, time.time(), src_session_id),
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"DeckStore: 复制卡组失败 {src_session_id} -> {target_session_id}: {e}")
+            return False
+        self._cache.pop(target_session_id, None)
+        return cur.rowcount > 0
+
+    def expire(self, max_age: float) -> int:
+        """删除超过 max_age 秒未更新的会话卡组及不再被引用的卡组数据，返回删除的会话数"""
+        if not self._conn:
+            return 0
+        try:
+            cur = self._conn.execute(
+                "DELETE FROM session_decks WHERE updated_at < ?", (time.time() - max_age,)
+            )
+            removed = cur.rowcount
+            # 会话过期或被覆盖后，不再被任何会话引用的卡组数据一并删除
+            self._conn.execute(
+                "DELETE FROM decks WHERE content_key NOT IN"
+                " (SELECT content_key FROM session_decks)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"DeckStore: 清理过期卡组失败: {e}")
+            return 0
+        if removed > 0:
+            self._cache.clear()
+        return removed
+
+    def migrate_ydk_dir(self, cache_dir: str) -> int:
+        """导入旧版 deck_cache/deck_<session>.ydk 文件 (保留原修改时间)，导入后删除文件"""
+        if not self._conn or not os.path.isdir(cache_dir):
+            return 0
+        migrated = 0
+        for entry in os.scandir(cache_dir):
+            name = entry.name
+            if not (entry.is_file() and name.startswith("deck_") and name.endswith(".ydk")):
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    deck = Deck.from_ydk(f.read())
+                if self.put(name[5:-4], deck, updated_at=entry.stat().st_mtime):
+                    os.remove(entry.path)
+                    migrated += 1
+            except Exception as e:
+                logger.warning(f"DeckStore: 迁移 {name} 失败: {e}")
+        self._cache.clear()
+        if migrated:
+            logger.info(f"DeckStore: 已迁移 {migrated} 个旧版 YDK 缓存文件")
+        return migrated
+
+    def stats(self) -> Dict[str, int]:
+        sessions = decks = 0
+        if self._conn:
+            try:
+                sessions = self._conn.execute("SELECT COUNT(*) FROM session_decks").fetchone()[0]
+                decks = self._conn.execute("SELECT COUNT(*) FROM decks").fetchone()[0]
+            except Exception:
+                pass
+        return {
+            "sessions": sessions,
+            "decks": decks,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
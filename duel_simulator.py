@@ -1,63 +1,231 @@
 # -*- coding: utf-8 -*-
+import sys
+import time
 import random
-from typing import Dict, List, Optional, Tuple
+from collections import Counter, OrderedDict, deque
+from typing import Any, Dict, List, Optional
+from astrbot.api.all import logger
 
-class DuelSimulator:
-    def __init__(self):
-        # 存储结构: 
-        # { 
-        #   "user_12345": { 
-        #       "deck": ["89631139", ...], 
-        #       "hand": ["12345678", ...] 
-        #   } 
-        # }
-        self.states: Dict[str, Dict[str, List[str]]] = {}
-
-    def init_duel(self, user_id: str, main_deck_ids: List[str]):
-        """初始化决斗状态：重置手牌，洗切卡组"""
-        deck = main_deck_ids.copy()
+from .deck import Deck
+
+
+class DuelState:
+    """
+    单个用户的对局状态
+    - deck: 洗好的卡组 (左端为卡组顶)，抽卡为 O(1) 的 popleft
+    - counts: 卡组内各卡密剩余张数，检索 / 判断是否在卡组中为 O(1)
+    - 检索走的卡不从 deque 中间删除，而是记入 _taken，抽到时跳过
+    """
+
+    __slots__ = ("deck", "hand", "counts", "_taken", "deck_count", "last_access", "updated_at")
+
+    def __init__(self, main_deck_ids: List[str]):
+        deck = list(main_deck_ids)
         random.shuffle(deck)  # 洗牌
-        self.states[user_id] = {
-            "deck": deck,
-            "hand": []
-        }
+        self.deck = deque(deck)
+        self.hand: List[str] = []
+        self.counts = Counter(deck)
+        self._taken: Counter = Counter()
+        self.deck_count = len(deck)  # 卡组剩余张数
+        self.last_access = time.monotonic()
+        self.updated_at = time.time()  # 最后修改的时间戳 (持久化用)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"deck": list(self.deck), "hand": self.hand, "taken": dict(self._taken)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], updated_at: float) -> "DuelState":
+        """从持久化数据恢复 (保持原有牌序，不重新洗牌)"""
+        state = cls.__new__(cls)
+        state.deck = deque(str(c) for c in data.get("deck", []))
+        state.hand = [str(c) for c in data.get("hand", [])]
+        state._taken = Counter({str(k): int(v) for k, v in data.get("taken", {}).items()})
+        state.counts = Counter(state.deck)
+        state.counts.subtract(state._taken)
+        state.counts = +state.counts  # 去掉 <= 0 的项
+        state.deck_count = len(state.deck) - sum(state._taken.values())
+        state.last_access = time.monotonic()
+        state.updated_at = updated_at
+        return state
+
+    def contains(self, card_id: str) -> bool:
+        return self.counts.get(card_id, 0) > 0
+
+    def draw(self, count: int) -> List[str]:
+        drawn = []
+        while len(drawn) < count and self.deck:
+            card = self.deck.popleft()
+            if self._taken[card]:
+                # 该卡已被检索走，跳过这张“占位”
+                self._taken[card] -= 1
+                continue
+            self._take(card)
+            drawn.append(card)
+        return drawn
+
+    def search(self, card_id: str) -> bool:
+        if not self.contains(card_id):
+            return False
+        self._taken[card_id] += 1
+        self._take(card_id)
+        return True
+
+    def _take(self, card_id: str):
+        self.counts[card_id] -= 1
+        if not self.counts[card_id]:
+            del self.counts[card_id]
+        self.deck_count -= 1
+        self.hand.append(card_id)
+
+    def approx_bytes(self) -> int:
+        """粗略估算内存占用 (卡密字符串与卡组列表共享，不重复计算)"""
+        return (
+            sys.getsizeof(self.deck)
+            + sys.getsizeof(self.hand)
+            + sys.getsizeof(self.counts)
+            + sys.getsizeof(self._taken)
+        )
+
+
+class DuelSimulator:
+    """
+    卡组起手 / 抽卡模拟
+    - 按最近操作时间排序 (OrderedDict)，闲置超过 idle_ttl 的对局自动清除
+    - 同时进行的对局数超过 max_games 时，淘汰最久未操作的对局
+    - 指定 store 时对局会持久化：修改只标记为脏，由 flush() 批量写回；
+      内存中没有的对局在用户下次操作时从 store 读取
+    """
+
+    def __init__(self, max_games: int = 2000, idle_ttl: float = 6 * 3600, store=None):
+        self.max_games = max_games
+        self.idle_ttl = idle_ttl
+        self.store = store
+        # { "user_12345": DuelState }，末尾为最近操作
+        self.states: "OrderedDict[str, DuelState]" = OrderedDict()
+        # 已修改、尚未写回 store 的用户
+        self._dirty: set = set()
+        self.evictions = 0
+        self.rehydrated = 0
+
+    def _prune(self):
+        """清除闲置过期的对局，并把对局数压到上限以内"""
+        deadline = time.monotonic() - self.idle_ttl
+        evicted_dirty = []
+        while self.states:
+            user_id, state = next(iter(self.states.items()))
+            if state.last_access >= deadline and len(self.states) <= self.max_games:
+                break
+            del self.states[user_id]
+            self.evictions += 1
+            if user_id in self._dirty:
+                self._dirty.discard(user_id)
+                # 因容量被挤出内存的对局先写回，之后仍可从 store 恢复
+                if state.last_access >= deadline:
+                    evicted_dirty.append((user_id, state))
+        if evicted_dirty and self.store:
+            self.store.save_many((u, s.to_dict(), s.updated_at) for u, s in evicted_dirty)
+
+    def _touch(self, user_id: str, state: DuelState):
+        state.updated_at = time.time()
+        self._dirty.add(user_id)
+
+    def init_duel(self, user_id: str, deck: Deck):
+        """初始化决斗状态：以卡组的主卡组重置手牌，洗切卡组"""
+        self.states.pop(user_id, None)
+        state = DuelState(deck.main_ids())
+        self.states[user_id] = state
+        self._touch(user_id, state)
+        self._prune()
 
     def draw_card(self, user_id: str, count: int = 1) -> List[str]:
         """从卡组顶端抽卡"""
-        state = self.states.get(user_id)
+        state = self.get_state(user_id)
         if not state:
             return []
-        
-        drawn = []
-        for _ in range(count):
-            if state["deck"]:
-                card = state["deck"].pop(0)  # 移除列表第一个元素
-                state["hand"].append(card)
-                drawn.append(card)
-            else:
-                break
+        drawn = state.draw(count)
+        if drawn:
+            self._touch(user_id, state)
         return drawn
 
     def remove_from_deck_to_hand(self, user_id: str, card_id: str) -> bool:
         """精准检索：将指定ID从卡组移到手牌"""
-        state = self.states.get(user_id)
+        state = self.get_state(user_id)
         if not state:
             return False
-        
-        # 检查卡片是否在卡组中
-        if card_id in state["deck"]:
-            state["deck"].remove(card_id)  # 移除指定ID
-            state["hand"].append(card_id)  # 加入手牌
-            return True
-        return False
-
-    def get_state(self, user_id: str) -> Optional[Dict[str, List[str]]]:
-        """获取用户当前的决斗状态"""
-        return self.states.get(user_id)
+        if not state.search(card_id):
+            return False
+        self._touch(user_id, state)
+        return True
+
+    def _rehydrate(self, user_id: str) -> Optional[DuelState]:
+        """从 store 恢复对局 (重启后用户第一次操作时)"""
+        if not self.store:
+            return None
+        loaded = self.store.load(user_id)
+        if not loaded:
+            return None
+        data, updated_at = loaded
+        if time.time() - updated_at > self.idle_ttl:
+            return None
+        try:
+            state = DuelState.from_dict(data, updated_at)
+        except Exception as e:
+            logger.warning(f"DuelSimulator: 对局数据损坏，已忽略 {user_id}: {e}")
+            return None
+        self.states[user_id] = state
+        self.rehydrated += 1
+        self._prune()
+        return state
+
+    def get_state(self, user_id: str) -> Optional[DuelState]:
+        """获取用户当前的决斗状态 (闲置过期视为无对局)"""
+        state = self.states.get(user_id)
+        if not state:
+            return self._rehydrate(user_id)
+        now = time.monotonic()
+        if now - state.last_access > self.idle_ttl:
+            del self.states[user_id]
+            self._dirty.discard(user_id)
+            self.evictions += 1
+            return None
+        state.last_access = now
+        self.states.move_to_end(user_id)
+        return state
 
     def check_deck_contains(self, user_id: str, card_id: str) -> bool:
         """检查卡组里是否有某张卡（不移动）"""
-        state = self.states.get(user_id)
+        state = self.get_state(user_id)
         if not state:
             return False
-        return card_id in state["deck"]
\ No newline at end of file
+        return state.contains(card_id)
+
+    def flush(self) -> int:
+        """把已修改的对局批量写回 store，返回写入条数"""
+        if not self.store or not self._dirty:
+            return 0
+        rows = [
+            (user_id, self.states[user_id].to_dict(), self.states[user_id].updated_at)
+            for user_id in self._dirty
+            if user_id in self.states
+        ]
+        self._dirty.clear()
+        self.store.save_many(rows)
+        return len(rows)
+
+    def compact(self) -> int:
+        """删除 store 中闲置过期的对局"""
+        if not self.store:
+            return 0
+        return self.store.compact(self.idle_ttl)
+
+    def stats(self) -> Dict[str, int]:
+        self._prune()
+        return {
+            "games": len(self.states),
+            "max_games": self.max_games,
+            "evictions": self.evictions,
+            "bytes": sum(s.approx_bytes() for s in self.states.values()),
+            "stored": self.store.count() if self.store else 0,
+            "dirty": len(self._dirty),
+            "rehydrated": self.rehydrated,
+        }
\ No newline at end of file
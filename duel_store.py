@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from astrbot.api.all import logger
+
+
+class DuelStore:
+    """
+    模拟对局持久化 (SQLite，按用户一行)
+    - 由 DuelSimulator 批量写回 (write-behind)，抽卡本身不触发磁盘写入
+    - 按需读取：用户第一次操作时才加载其对局，启动时不预加载
+    - compact(): 删除长期闲置的对局并回收空间
+    """
+
+    def __init__(self, data_dir: str):
+        self.db_path = os.path.join(data_dir, "duel_sessions.db")
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS duel_state ("
+                " user_id TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_duel_state_updated"
+                " ON duel_state (updated_at)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            # 持久化不可用时对局仅保存在内存中
+            logger.warning(f"DuelStore: 初始化失败，模拟对局将不会持久化: {e}")
+            self._conn = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    def load(self, user_id: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """读取用户对局，返回 (数据, 最后更新时间戳)，不存在返回 None"""
+        if not self._conn:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT payload, updated_at FROM duel_state WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"DuelStore: 读取对局失败 {user_id}: {e}")
+            return None
+        if not row:
+            return None
+        try:
+            return json.loads(row[0]), row[1]
+        except ValueError:
+            return None
+
+    def save_many(self, rows: Iterable[Tuple[str, Dict[str, Any], float]]):
+        """批量写入 (user_id, 数据, 更新时间戳)，单个事务提交"""
+        if not self._conn:
+            return
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO duel_state (user_id, payload, updated_at) VALUES (?, ?, ?)",
+                [
+                    (user_id, json.dumps(payload, separators=(",", ":")), ts)
+                    for user_id, payload, ts in rows
+                ],
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"DuelStore: 写入对局失败: {e}")
+
+    def delete_many(self, user_ids: List[str]):
+        if not self._conn or not user_ids:
+            return
+        try:
+            self._conn.executemany(
+                "DELETE FROM duel_state WHERE user_id = ?", [(u,) for u in user_ids]
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"DuelStore: 删除对局失败: {e}")
+
+    def compact(self, max_idle: float) -> int:
+        """删除闲置超过 max_idle 秒的对局，返回删除条数"""
+        if not self._conn:
+            return 0
+        try:
+            cur = self._conn.execute(
+                "DELETE FROM duel_state WHERE updated_at < ?", (time.time() - max_idle,)
+            )
+            self._conn.commit()
+            removed = cur.rowcount
+            if removed > 0:
+                self._conn.execute("VACUUM")
+            return removed
+        except Exception as e:
+            logger.warning(f"DuelStore: 清理对局失败: {e}")
+            return 0
+
+    def count(self) -> int:
+        if not self._conn:
+            return 0
+        try:
+            return self._conn.execute("SELECT COUNT(*) FROM duel_state").fetchone()[0]
+        except Exception:
+            return 0
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+字体注册表：字体文件只查找一次，每个字号只解析一次
+本模块只依赖 Pillow，绘图子进程 (render_worker) 也可直接使用
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from PIL import ImageFont
+
+VALID_EXTENSIONS = {".ttf", ".ttc", ".otf"}
+PRIORITY_FILES = ["msyh.ttc", "msyh.ttf", "simhei.ttf"]
+
+# 字体规格: (文件路径, 修改时间)，文件被替换后修改时间变化，缓存自然失效
+FontSpec = Tuple[str, float]
+
+# 进程内共享的已解析字体 { (路径, 修改时间, 字号): 字体对象 }
+_FONTS: Dict[Tuple[str, float, int], "ImageFont.ImageFont"] = {}
+_FONTS_LOCK = threading.Lock()
+
+
+def load_font(spec: Optional[FontSpec], size: int):
+    """按规格加载字体 (带缓存)，找不到或解析失败时使用 Pillow 默认字体"""
+    path, mtime = spec or ("", 0.0)
+    key = (path, mtime, size)
+    with _FONTS_LOCK:
+        font = _FONTS.get(key)
+        if font is None:
+            try:
+                font = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+            except Exception:
+                font = ImageFont.load_default()
+            _FONTS[key] = font
+        return font
+
+
+def clear_fonts():
+    with _FONTS_LOCK:
+        _FONTS.clear()
+
+
+class FontRegistry:
+    """
+    插件目录字体查找 + 缓存
+    - 优先 msyh / simhei，否则取目录下第一个字体文件
+    - 查找结果与解析后的字体都会缓存，放入新字体后调用 reload() 生效
+    """
+
+    def __init__(self, font_dir: str):
+        self.font_dir = font_dir
+        self._spec: Optional[FontSpec] = None
+        self._resolved = False
+        self._lock = threading.Lock()
+
+    def _resolve(self) -> Optional[FontSpec]:
+        font_path = None
+        for f in PRIORITY_FILES:
+            p = os.path.join(self.font_dir, f)
+            if os.path.exists(p):
+                font_path = p
+                break
+
+        if not font_path:
+            try:
+                for filename in sorted(os.listdir(self.font_dir)):
+                    if os.path.splitext(filename)[1].lower() in VALID_EXTENSIONS:
+                        font_path = os.path.join(self.font_dir, filename)
+                        break
+            except OSError:
+                pass
+
+        if not font_path:
+            return None
+        try:
+            return (font_path, os.path.getmtime(font_path))
+        except OSError:
+            return None
+
+    @property
+    def spec(self) -> Optional[FontSpec]:
+        """当前字体规格 (可直接传给绘图子进程)，未找到字体时为 None"""
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    self._spec = self._resolve()
+                    self._resolved = True
+        return self._spec
+
+    def get(self, size: int = 24):
+        return load_font(self.spec, size)
+
+    def reload(self) -> Optional[str]:
+        """重新查找字体并清空已解析的字体，返回新的字体路径"""
+        with self._lock:
+            self._resolved = False
+            self._spec = None
+        clear_fonts()
+        spec = self.spec
+        return spec[0] if spec else None
@@ -37,8 +37,9 @@ class TierData:
 
 
 class GenericTierManager:
-    def __init__(self, data_dir: str):  # 1. 参数名改为 data_dir
+    def __init__(self, data_dir: str, http):  # 1. 参数名改为 data_dir
         self.data_dir = data_dir  # 2. 属性名改为 self.data_dir
+        self.http = http  # 插件共享的 HttpClient
         self.ensure_data_dir()
         self.translations = self.load_external_translations()
 
@@ -188,27 +189,24 @@ class GenericTierManager:
             if (d not in self.translations) or (self.translations[d] == d)
         ]
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-        async with aiohttp.ClientSession(trust_env=True, headers=headers) as session:
-            tasks = []
-            for deck in targets:
-                # 注意：这里我们使用 self.get_chinese_name(session, ...)
-                tasks.append(self.get_chinese_name(session, deck, force_api=True))
-
-            if tasks:
-                # 并发获取所有翻译
-                cn_names = await asyncio.gather(*tasks)
-
-                for deck, cn_name in zip(targets, cn_names):
-                    if cn_name != deck:
-                        self.translations[deck] = cn_name
-                        updated_count += 1
-                        new_translations.append(f"{deck} -> {cn_name}")
-                    else:
-                        if deck not in self.translations:
-                            self.translations[deck] = deck
+        session = self.http.session
+        tasks = []
+        for deck in targets:
+            # 注意：这里我们使用 self.get_chinese_name(session, ...)
+            tasks.append(self.get_chinese_name(session, deck, force_api=True))
+
+        if tasks:
+            # 并发获取所有翻译
+            cn_names = await asyncio.gather(*tasks)
+
+            for deck, cn_name in zip(targets, cn_names):
+                if cn_name != deck:
+                    self.translations[deck] = cn_name
+                    updated_count += 1
+                    new_translations.append(f"{deck} -> {cn_name}")
+                else:
+                    if deck not in self.translations:
+                        self.translations[deck] = deck
 
         if updated_count > 0:
             self.save_external_translations()
@@ -490,7 +488,7 @@ class GenericTierManager:
 
         content = ""
         try:
-            async with session.get(url, timeout=15, ssl=False) as response:
+            async with session.get(url, headers=headers, timeout=15, ssl=False) as response:
                 response.raise_for_status()  # 异步检查状态码
                 content = await response.text()  # 异步读取文本内容
         except Exception as e:
@@ -533,72 +531,68 @@ class GenericTierManager:
         )
 
     async def crawl_tier_data(self, game_type: GameType) -> Optional[TierData]:
-        # 统一创建并管理 session
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-
-        async with aiohttp.ClientSession(trust_env=True, headers=headers) as session:
-            try:
-                # 1. 爬取 T 表基础数据
-                # 注意：这里需要传入 session，因为 _async_crawl_tier_data 我们之前改为接收 session 了
-                # 如果你的 _async_crawl_tier_data 还是自己开 session 的旧版，请去掉 session 参数
-                tier_data = await self._async_crawl_tier_data(session, game_type)
-
-                # 2. 收集所有需要翻译的卡组
-                all_decks = set()
-                for decks in tier_data.tiers.values():
-                    for d in decks:
-                        all_decks.add(d)
-
-                # 3. 异步获取翻译
-                tasks = []
-                deck_names_for_api = []  # 存储需要 API 翻译的英文名
-
-                for deck_name in all_decks:
-                    # 避免对已有翻译的卡组进行 API 调用
-                    if (
-                        deck_name in self.translations
-                        and self.translations[deck_name] != deck_name
-                    ):
-                        tier_data.deck_translations[deck_name] = self.translations[
-                            deck_name
-                        ]
-                        continue
-
-                    # 创建翻译任务
-                    task_coroutine = self.get_chinese_name(
-                        session, deck_name, force_api=True
-                    )
-                    tasks.append(task_coroutine)
-                    deck_names_for_api.append(deck_name)
+        # 统一使用插件共享的 session
+        session = self.http.session
+        try:
+            # 1. 爬取 T 表基础数据
+            # 注意：这里需要传入 session，因为 _async_crawl_tier_data 我们之前改为接收 session 了
+            # 如果你的 _async_crawl_tier_data 还是自己开 session 的旧版，请去掉 session 参数
+            tier_data = await self._async_crawl_tier_data(session, game_type)
+
+            # 2. 收集所有需要翻译的卡组
+            all_decks = set()
+            for decks in tier_data.tiers.values():
+                for d in decks:
+                    all_decks.add(d)
+
+            # 3. 异步获取翻译
+            tasks = []
+            deck_names_for_api = []  # 存储需要 API 翻译的英文名
+
+            for deck_name in all_decks:
+                # 避免对已有翻译的卡组进行 API 调用
+                if (
+                    deck_name in self.translations
+                    and self.translations[deck_name] != deck_name
+                ):
+                    tier_data.deck_translations[deck_name] = self.translations[
+                        deck_name
+                    ]
+                    continue
+
+                # 创建翻译任务
+                task_coroutine = self.get_chinese_name(
+                    session, deck_name, force_api=True
+                )
+                tasks.append(task_coroutine)
+                deck_names_for_api.append(deck_name)
 
-                # 4. 并发执行翻译任务
-                if tasks:
-                    # 【修复点 1】这里应该是 *tasks，不是 *api_tasks
-                    cn_names = await asyncio.gather(*tasks)
+            # 4. 并发执行翻译任务
+            if tasks:
+                # 【修复点 1】这里应该是 *tasks，不是 *api_tasks
+                cn_names = await asyncio.gather(*tasks)
 
-                    # 【修复点 2】这里应该是 deck_names_for_api，不是 deck_names
-                    for en_name, cn_name in zip(deck_names_for_api, cn_names):
-                        tier_data.deck_translations[en_name] = cn_name
-                        self.translations[en_name] = cn_name
+                # 【修复点 2】这里应该是 deck_names_for_api，不是 deck_names
+                for en_name, cn_name in zip(deck_names_for_api, cn_names):
+                    tier_data.deck_translations[en_name] = cn_name
+                    self.translations[en_name] = cn_name
 
-                # 5. 将合并后的翻译设置到 TierData
-                tier_data.deck_translations.update(self.translations)
+            # 5. 将合并后的翻译设置到 TierData
+            tier_data.deck_translations.update(self.translations)
 
-                return tier_data
+            return tier_data
 
-            except Exception as e:
-                import traceback
+        except Exception as e:
+            import traceback
 
-                traceback.print_exc()  # 建议保留这个，方便看报错
-                logger.error(f"[Tier] 爬取或翻译流程失败: {e}")
-                return None
+            traceback.print_exc()  # 建议保留这个，方便看报错
+            logger.error(f"[Tier] 爬取或翻译流程失败: {e}")
+            return None
 
 
 class TierCommandHandler:
-    def __init__(self, data_dir: str):  # 参数名对应 main.py 传进来的含义
-        self.manager = GenericTierManager(data_dir)
+    def __init__(self, data_dir: str, http):  # 参数名对应 main.py 传进来的含义
+        self.manager = GenericTierManager(data_dir, http)
 
     async def update_tier_list(self, event, game_type: GameType, game_name: str):
         try:
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+起手概率计算
+- 精确解: 各卡组互不重叠时，用 (多元) 超几何分布直接求和
+- 蒙特卡洛: 卡组编码为整数数组，NumPy 批量洗牌取前 N 张，统计命中率与置信区间
+未安装 NumPy 时退化为纯 Python 抽样 (次数较少，结果仅供参考)
+"""
+import math
+import random
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+DEFAULT_TRIALS = 1_000_000
+FALLBACK_TRIALS = 20_000
+BATCH_SIZE = 100_000
+
+
+class HandGroup:
+    """一组卡片 (如“动点”“展开”“手坑”)，起手中至少 min_count 张即视为满足"""
+
+    __slots__ = ("name", "card_ids", "min_count")
+
+    def __init__(self, name: str, card_ids: Set[str], min_count: int = 1):
+        self.name = name
+        self.card_ids = set(card_ids)
+        self.min_count = min_count
+
+
+def wilson_interval(hits: int, trials: int, z: float = 1.96) -> Tuple[float, float]:
+    """命中率的 Wilson 置信区间 (默认 95%)"""
+    if trials <= 0:
+        return 0.0, 0.0
+    p = hits / trials
+    denom = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def exact_probability(main: Sequence[str], groups: List[HandGroup], hand_size: int) -> Optional[float]:
+    """
+    多元超几何精确解：所有卡组同时满足的概率
+    卡组之间有重叠时返回 None (需要走蒙特卡洛)
+    """
+    seen: Set[str] = set()
+    for g in groups:
+        if seen & g.card_ids:
+            return None
+        seen |= g.card_ids
+
+    deck_size = len(main)
+    if hand_size > deck_size or not groups:
+        return None
+    sizes = [sum(1 for cid in main if cid in g.card_ids) for g in groups]
+    rest = deck_size - sum(sizes)
+
+    total = 0
+    ranges = [range(g.min_count, min(size, hand_size) + 1) for g, size in zip(groups, sizes)]
+    for ks in product(*ranges):
+        taken = sum(ks)
+        if taken > hand_size:
+            continue
+        ways = math.comb(rest, hand_size - taken)
+        for size, k in zip(sizes, ks):
+            ways *= math.comb(size, k)
+        total += ways
+    return total / math.comb(deck_size, hand_size)
+
+
+def encode_deck(main: Sequence[str], groups: List[HandGroup]):
+    """卡密编码为 0..n-1 的整数，并为每组生成 “编码 -> 是否属于该组” 的查表数组"""
+    codes: Dict[str, int] = {}
+    deck = np.fromiter((codes.setdefault(cid, len(codes)) for cid in main), dtype=np.int16, count=len(main))
+    tables = []
+    for g in groups:
+        table = np.zeros(len(codes), dtype=np.int8)
+        for cid in g.card_ids:
+            if cid in codes:
+                table[codes[cid]] = 1
+        tables.append(table)
+    return deck, tables
+
+
+def partial_shuffle(rng, deck, n: int, depth: int):
+    """
+    批量“部分洗牌”：Fisher-Yates 只做前 depth 步
+    返回 n 行，每行为一次洗牌后卡组顶端的 depth 张
+    """
+    deck_size = len(deck)
+    decks = np.broadcast_to(deck, (n, deck_size)).copy()
+    rows = np.arange(n)
+    for i in range(depth):
+        j = rng.integers(i, deck_size, size=n)
+        picked = decks[rows, j]
+        decks[rows, j] = decks[rows, i]
+        decks[rows, i] = picked
+    return decks[:, :depth]
+
+
+def _simulate_numpy(main, groups, hand_size, trials, seed) -> int:
+    deck, tables = encode_deck(main, groups)
+    mins = [g.min_count for g in groups]
+    rng = np.random.default_rng(seed)
+    hits = 0
+    done = 0
+    while done < trials:
+        n = min(BATCH_SIZE, trials - done)
+        hands = partial_shuffle(rng, deck, n, hand_size)
+        ok = np.ones(n, dtype=bool)
+        for table, need in zip(tables, mins):
+            ok &= table[hands].sum(axis=1) >= need
+        hits += int(ok.sum())
+        done += n
+    return hits
+
+
+def _simulate_python(main, groups, hand_size, trials, seed) -> int:
+    rng = random.Random(seed)
+    deck = list(main)
+    hits = 0
+    for _ in range(trials):
+        hand = rng.sample(deck, hand_size)
+        if all(sum(1 for cid in hand if cid in g.card_ids) >= g.min_count for g in groups):
+            hits += 1
+    return hits
+
+
+def simulate(
+    main: Sequence[str],
+    groups: List[HandGroup],
+    hand_size: int = 5,
+    trials: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Dict:
+    """蒙特卡洛估计起手同时满足所有卡组的概率"""
+    if trials is None:
+        trials = DEFAULT_TRIALS if HAS_NUMPY else FALLBACK_TRIALS
+    if not HAS_NUMPY:
+        trials = min(trials, FALLBACK_TRIALS)
+    if hand_size > len(main) or trials <= 0:
+        return {"hits": 0, "trials": 0, "rate": 0.0, "ci": (0.0, 0.0)}
+
+    if HAS_NUMPY:
+        hits = _simulate_numpy(main, groups, hand_size, trials, seed)
+    else:
+        hits = _simulate_python(main, groups, hand_size, trials, seed)
+    return {
+        "hits": hits,
+        "trials": trials,
+        "rate": hits / trials,
+        "ci": wilson_interval(hits, trials),
+    }
+
+
+def evaluate(
+    main: Sequence[str],
+    groups: List[HandGroup],
+    hand_size: int = 5,
+    trials: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    计算起手概率 (有精确解时不再做蒙特卡洛)
+    返回: { "exact": 精确解或 None, "groups": [(组名, 单组命中概率)], "mc": 蒙特卡洛结果或 None }
+    """
+    per_group = [(g.name, exact_probability(main, [g], hand_size)) for g in groups]
+    exact = exact_probability(main, groups, hand_size)
+    return {
+        "exact": exact,
+        "groups": per_group,
+        "mc": simulate(main, groups, hand_size, trials, seed) if exact is None else None,
+    }
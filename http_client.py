@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from typing import Optional
+import aiohttp
+from astrbot.api.all import logger
+
+
+class HttpClient:
+    """
+    插件共享的 HTTP 客户端
+    - 所有 Manager 复用同一个连接池 (Keep-Alive / DNS 缓存 / TLS 会话)
+    - 按主机限制并发连接数，避免打爆 CDN
+    - Session 在首次使用时创建 (需要在事件循环中)，插件卸载时统一关闭
+    """
+
+    DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+    def __init__(
+        self,
+        total_timeout: float = 30,
+        connect_timeout: float = 10,
+        limit: int = 100,
+        limit_per_host: int = 16,
+        dns_ttl: int = 600,
+        keepalive_timeout: float = 60,
+    ):
+        self.total_timeout = total_timeout
+        self.connect_timeout = connect_timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """获取共享 Session (懒加载，关闭后自动重建)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=False,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.total_timeout, sock_connect=self.connect_timeout
+                ),
+                headers=self.DEFAULT_HEADERS,
+                trust_env=True,
+            )
+            logger.info(
+                f"HttpClient: 已创建共享连接池 (每主机 {self.limit_per_host} 连接, DNS 缓存 {self.dns_ttl}s)"
+            )
+        return self._session
+
+    async def close(self):
+        """关闭共享 Session 及其连接池"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
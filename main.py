@@ -12,9 +12,10 @@ import json
 import random
 import re
 import asyncio
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional
 import aiohttp
-import html
+import codecs
 
 
 from astrbot.api.star import Star, register, StarTools  # 引入 StarTools
@@ -34,11 +35,31 @@ from .deck_breakdown import DeckBreakdownManager
 from .rotk_manager import RotKManager
 
 from .duel_simulator import DuelSimulator #引入 DuelSimulator
+from .duel_store import DuelStore
+from .deck import Deck
 
 from .banlist_manager import BanlistManager #引入 BanlistManager
 
+from .card_cache import CardDetailCache
+from .card_database import CardDatabase
+from .card_name_index import CardNameIndex
+from .search_cache import SearchCursor, SearchResultCache
+from .session_map import SessionMap
+from .card_page_cache import CardPage, CardPageCache
+from .card_page_parser import CardPageParser, parse_card_page
+from .http_client import HttpClient
+from . import hand_probability
+from .hand_probability import HandGroup
+from .batch_simulation import BatchSimulator, DeckVariant
+from .render_backend import RenderPool
+from .cache_janitor import CacheJanitor
+
 
 class YugiohCardSearcher:
+    # 查卡结果每页条数
+    PAGE_SIZE = 10
+    # 详情页流式解析的读取块大小
+    PAGE_CHUNK_SIZE = 16 * 1024
     # 将映射表提升为类常量，解决 PEP 8 问题
     ATTRIBUTE_MAP = {1: "地", 2: "水", 4: "炎", 8: "风", 16: "光", 32: "暗", 64: "神"}
     RACE_MAP = {
@@ -66,18 +87,121 @@ class YugiohCardSearcher:
         2097152: "幻神兽",
     }
 
-    def __init__(self):
+    def __init__(
+        self,
+        http: HttpClient,
+        detail_cache: Optional[CardDetailCache] = None,
+        local_db: Optional[CardDatabase] = None,
+    ):
         self.base_url = "https://ygocdb.com/api/v0"
-        # 优化资源管理：复用 Session
-        self.session = aiohttp.ClientSession(trust_env=True, headers={"User-Agent": "Mozilla/5.0"})
+        # 优化资源管理：复用插件共享的连接池
+        self.http = http
+        # 卡片详情缓存 (可选)，避免热门卡片被反复请求
+        self.detail_cache = detail_cache
+        # 本地离线卡库 (可选)，导入后搜索与详情优先走本地
+        self.local_db = local_db
+        # 基于本地卡库的多语言名称索引，在线程池中后台构建，构建完成前查卡走 API
+        self.name_index: Optional[CardNameIndex] = None
+        self._index_task: Optional[asyncio.Task] = None
+        # 查卡结果缓存 (所有用户共享，按归一化查询词索引)
+        self.search_cache = SearchResultCache()
+        # 详情页解析结果 (卡盒 / 裁定) 缓存，过期后按 ETag / Last-Modified 重新验证
+        self.page_cache = CardPageCache()
+        # { 卡密: 详情页加载任务 }，同一页面的并发请求共用一次下载
+        self._page_tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self.http.session
 
     async def close(self):
-        """关闭 Session"""
-        if self.session:
-            await self.session.close()
+        """关闭本地缓存与卡库 (共享 Session 由插件统一关闭)"""
+        if self._index_task:
+            self._index_task.cancel()
+        if self.detail_cache:
+            self.detail_cache.close()
+        if self.local_db:
+            self.local_db.close()
+
+    def _build_name_index(self) -> CardNameIndex:
+        """[同步方法] 从本地卡库构建名称索引，在线程池中调用"""
+        index = CardNameIndex()
+        if self.local_db and self.local_db.available:
+            index.build(self.local_db.iter_names())
+        return index
+
+    async def rebuild_name_index(self) -> int:
+        """
+        在线程池中重建名称索引，返回收录卡片数
+        先构建新索引再在事件循环中整体替换，进行中的后台构建会被取消
+        """
+        if self.index_building and self._index_task is not asyncio.current_task():
+            self._index_task.cancel()
+        index = await asyncio.get_running_loop().run_in_executor(None, self._build_name_index)
+        self.name_index = index
+        self.search_cache.clear()
+        logger.info(f"DuelGalatea: 名称索引已构建 ({len(index)} 张)")
+        return len(index)
+
+    async def _rebuild_name_index_quietly(self):
+        try:
+            await self.rebuild_name_index()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"DuelGalatea: 名称索引构建失败: {e}")
+
+    def start_name_index_build(self):
+        """本地卡库已导入且索引未构建时，启动后台构建 (没有运行中的事件循环时跳过)"""
+        if not (self.local_db and self.local_db.available) or self.name_index is not None:
+            return
+        if self.index_building:
+            return
+        try:
+            self._index_task = asyncio.get_running_loop().create_task(self._rebuild_name_index_quietly())
+        except RuntimeError:
+            self._index_task = None
+
+    @property
+    def index_building(self) -> bool:
+        return bool(self._index_task and not self._index_task.done())
+
+    def _get_name_index(self) -> Optional[CardNameIndex]:
+        """获取名称索引，本地卡库未导入或索引仍在后台构建时返回 None (调用方回退到 API)"""
+        if not (self.local_db and self.local_db.available):
+            return None
+        if self.name_index is None:
+            self.start_name_index_build()
+        return self.name_index
+
+    def resolve_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        本地解析 名称(中/英/日) -> 卡片详情，找不到返回 None
+        供禁卡表、Genesys、卡组拆解等批量解析使用，调用方自行回退到 API
+        """
+        index = self._get_name_index()
+        if not index or not name:
+            return None
+        card_id = index.resolve(name)
+        return self.local_db.get(card_id) if card_id else None
+
+    def invalidate_detail_cache(self):
+        """清空卡片详情缓存 (禁卡表 / Genesys 数据刷新后调用)"""
+        if self.detail_cache:
+            self.detail_cache.invalidate()
 
     async def search_card(self, query: str) -> Dict[str, Any]:
-        """异步搜索卡片"""
+        """异步搜索卡片 (本地卡库优先，无结果时回退到 API)"""
+        index = self._get_name_index()
+        if index:
+            # 纯数字按卡密直接查
+            if query.isdigit():
+                card = self.local_db.get(query)
+                if card:
+                    return {"result": [card]}
+            card_ids = index.lookup(query, k=100)
+            if card_ids:
+                return {"result": self.local_db.get_many(card_ids)}
         try:
             url = f"{self.base_url}/?search={query}"
             async with self.session.get(url, timeout=10, ssl=False) as response:
@@ -89,14 +213,39 @@ class YugiohCardSearcher:
         except Exception as e:
             return {"error": f"搜索出错: {str(e)}"}
 
+    async def search_card_cached(self, query: str) -> Dict[str, Any]:
+        """
+        带共享缓存的搜索，结果只含 id / cn_name / type
+        用于查卡列表、翻页与选卡；需要完整卡片数据时使用 search_card
+        """
+        results = self.search_cache.get(query)
+        if results is not None:
+            return {"result": results}
+        result = await self.search_card(query)
+        if "error" in result:
+            return result
+        return {"result": self.search_cache.put(query, result.get("result") or [])}
+
     async def get_card_detail(self, card_id: str) -> Dict[str, Any]:
-        """异步获取卡片详情"""
+        """异步获取卡片详情 (优先读取缓存)"""
+        if self.detail_cache:
+            cached = self.detail_cache.get(card_id)
+            if cached is not None:
+                return cached
+        if self.local_db:
+            detail = self.local_db.get(card_id)
+            if detail is not None:
+                return detail
         try:
             url = f"{self.base_url}/card/{card_id}?show=all"
             async with self.session.get(url, timeout=10, ssl=False) as response:
                 if response.status == 200:
                     # 修复：必须返回解析后的 JSON
-                    return await response.json(content_type=None)
+                    detail = await response.json(content_type=None)
+                    # 只缓存有效的详情，错误结果不缓存
+                    if self.detail_cache and isinstance(detail, dict) and detail.get("id"):
+                        self.detail_cache.set(card_id, detail)
+                    return detail
                 else:
                     return {"error": f"获取详情失败: {response.status}"}
         except Exception as e:
@@ -204,7 +353,7 @@ class YugiohCardSearcher:
     def format_search_results(
         self, results: List[Dict], page: int, user_id: str
     ) -> str:
-        page_size = 10
+        page_size = self.PAGE_SIZE
         start_idx = (page - 1) * page_size
         end_idx = min(start_idx + page_size, len(results))
         current_results = results[start_idx:end_idx]
@@ -228,83 +377,71 @@ class YugiohCardSearcher:
     
     # === 新增：HTML 获取与解析方法 ===
 
-    async def get_card_html(self, card_id: str) -> str:
-        """获取百鸽详情页的 HTML 源码"""
+    async def get_card_page(self, card_id: str) -> Optional[CardPage]:
+        """
+        获取百鸽详情页的卡盒与裁定 (已解析)，失败且无缓存时返回 None
+        缓存未过期直接返回；过期后发条件请求，页面未变化 (304) 时不重新下载和解析
+        """
+        card_id = str(card_id)
+        page = self.page_cache.get(card_id)
+        if page is not None and self.page_cache.is_fresh(page):
+            self.page_cache.hits += 1
+            return page
+
+        task = self._page_tasks.get(card_id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load_card_page(card_id, page))
+            self._page_tasks[card_id] = task
+            task.add_done_callback(lambda _t: self._page_tasks.pop(card_id, None))
+        return await asyncio.shield(task)
+
+    async def _load_card_page(self, card_id: str, stale: Optional[CardPage]) -> Optional[CardPage]:
         url = f"https://ygocdb.com/card/{card_id}"
+        headers = stale.conditional_headers() if stale else {}
         try:
-            async with self.session.get(url, timeout=10, ssl=False) as response:
-                if response.status == 200:
-                    return await response.text()
+            async with self.session.get(url, headers=headers, timeout=10, ssl=False) as response:
+                if response.status == 304 and stale is not None:
+                    self.page_cache.touch(card_id)
+                    self.page_cache.revalidated += 1
+                    return stale
+                if response.status != 200:
+                    logger.warning(f"HTML fetch failed: {url} ({response.status})")
+                    return stale
+                # 边下载边解析，不拼接完整页面
+                parser = CardPageParser()
+                decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+                async for chunk in response.content.iter_chunked(self.PAGE_CHUNK_SIZE):
+                    parser.feed(decoder.decode(chunk))
+                parser.feed(decoder.decode(b"", final=True))
+                parser.close()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
         except Exception as e:
             logger.error(f"HTML fetch error: {e}")
-        return ""
+            # 网络异常时继续使用过期的解析结果
+            return stale
+
+        page = CardPage(parser.packs, parser.faq, etag, last_modified)
+        if stale is None:
+            self.page_cache.misses += 1
+        else:
+            self.page_cache.refetched += 1
+        self.page_cache.put(card_id, page)
+        return page
 
     def parse_card_packs(self, html_content: str) -> List[str]:
         """解析卡盒信息 (Date - Code - Name)"""
-        # 1. 找到包含 packs 的区域
-        pack_list = []
-        # 正则匹配 <li class="pack">...</li>
-        # 结构: <span>日期</span><span>编号</span><a ...>包名</a>
-        pattern = re.compile(
-            r'<li class="pack">\s*<span>(.*?)</span><span>(.*?)</span>\s*<a[^>]*>(.*?)</a>',
-            re.DOTALL
-        )
-        
-        matches = pattern.findall(html_content)
-        for date, code, name in matches:
-            # 清理 HTML 转义字符 (如 &#39;)
-            clean_name = html.unescape(name.strip())
-            pack_list.append(f"[{date}] {code} - {clean_name}")
-            
-        return pack_list
+        return parse_card_page(html_content)[0]
 
     def parse_card_faq(self, html_content: str) -> List[Dict[str, str]]:
         """解析 FAQ/裁定 (Q&A Box)"""
-        qa_list = []
-        
-        # 1. 提取所有 qabox
-        # <div class="qabox ..."> ... </div>
-        box_pattern = re.compile(r'<div class="qabox.*?>(.*?)<div class="info">', re.DOTALL)
-        boxes = box_pattern.findall(html_content)
-        
-        for box in boxes:
-            # 提取 Title, Question, Answer
-            title_m = re.search(r'<div class="qa title"[^>]*>(.*?)</div>', box, re.DOTALL)
-            q_m = re.search(r'<div class="qa question"[^>]*>(.*?)</div>', box, re.DOTALL)
-            a_m = re.search(r'<div class="qa answer"[^>]*>(.*?)</div>', box, re.DOTALL)
-            
-            if q_m and a_m:
-                t_str = self._clean_html(title_m.group(1)) if title_m else "Q&A"
-                q_str = self._clean_html(q_m.group(1))
-                a_str = self._clean_html(a_m.group(1))
-                
-                qa_list.append({
-                    "title": t_str,
-                    "q": q_str,
-                    "a": a_str
-                })
-                
-        return qa_list
-
-    def _clean_html(self, raw_html: str) -> str:
-        """清理 HTML 标签，转义字符，处理换行"""
-        if not raw_html: return ""
-        # 1. 处理换行: <br> -> \n
-        text = re.sub(r'<br\s*/?>', '\n', raw_html, flags=re.IGNORECASE)
-        # 2. 去除所有标签: <...>
-        text = re.sub(r'<[^>]+>', '', text)
-        # 3. 反转义: &lt; -> <
-        text = html.unescape(text)
-        return text.strip()
+        return parse_card_page(html_content)[1]
 
 
 @register("duel_galatea", "Noctfom", "游戏王全能插件", "1.4.1")
 class DuelGalateaPlugin(Star):
     def __init__(self, context=None, config: AstrBotConfig = None):
         super().__init__(context, config)
-        self.card_searcher = YugiohCardSearcher()
-        self.search_sessions = {}
-        self.last_viewed_cards = {}
         self.all_card_ids = []  # 全卡片ID池
 
         # === 修复数据持久化违规 ===
@@ -330,29 +467,131 @@ class DuelGalateaPlugin(Star):
 
         logger.info(f"DuelGalatea 数据目录: {self.data_dir}")
 
+        self.config = config or {}
+        # 按用户的会话状态 (闲置过期 + 数量上限)，长期运行内存不随群数增长
+        session_max = self.config.get("session_max_users", 1000)
+        session_ttl = self.config.get("session_idle_minutes", 30) * 60
+        # { user_id: SearchCursor }
+        self.search_sessions = SessionMap(maxsize=session_max, ttl=session_ttl)
+        # { user_id: {"card_id", "card_name"} }，详情按需从卡片缓存读取
+        self.last_viewed_cards = SessionMap(maxsize=session_max, ttl=session_ttl)
+        # { user_id: 预取任务 }，展示查卡结果后在后台预热详情与卡图 (可选)
+        self._prefetch_tasks: Dict[str, asyncio.Task] = {}
+
+        # 共享 HTTP 客户端，注入到所有 Manager，terminate() 时关闭
+        self.http = HttpClient(
+            total_timeout=self.config.get("http_total_timeout", 30),
+            connect_timeout=self.config.get("http_connect_timeout", 10),
+            limit_per_host=self.config.get("http_limit_per_host", 16),
+        )
+
+        # 查卡器 (带两级详情缓存 + 本地离线卡库)
+        self.card_searcher = YugiohCardSearcher(
+            self.http,
+            CardDetailCache(str(self.data_dir)),
+            CardDatabase(os.path.join(str(self.data_dir), "cards.db")),
+        )
+
         # 初始化各个 Manager，传入数据目录以便它们在正确的地方写文件
         # 注意：这里假设您的 Manager 构造函数已经更新为接收 data_dir
-        self.tier_handler = TierCommandHandler(str(self.data_dir))
-        self.rotk_manager = RotKManager(str(self.data_dir))
+        self.tier_handler = TierCommandHandler(str(self.data_dir), self.http)
+        self.rotk_manager = RotKManager(str(self.data_dir), self.http)
         # 实例化 YDKManager
-        self.ydk_manager = YDKManager(str(self.data_dir), self.plugin_source_dir)
+        self.ydk_manager = YDKManager(
+            str(self.data_dir),
+            self.plugin_source_dir,
+            self.http,
+            render_workers=self.config.get("render_workers", 0),
+            cdn_concurrency=self.config.get("cdn_concurrency", 6),
+        )
+
+        # 后台缓存清理 (按过期时间 + 容量预算，指令处理中不再清理)
+        self.janitor = CacheJanitor(interval=self.config.get("cache_janitor_minutes", 30) * 60)
+        self.janitor.add_directory(
+            "临时图片",
+            self.ydk_manager.images_dir,
+            max_age=self.CACHE_MAX_AGE,
+            max_bytes=self.config.get("temp_images_max_mb", 256) * 1024 * 1024,
+        )
+        self.janitor.add_hook(
+            "会话卡组", lambda: self.ydk_manager.deck_store.expire(self.CACHE_MAX_AGE)
+        )
+        # 卡片详情磁盘缓存: 批量写回访问时间并淘汰
+        self.janitor.add_hook("卡片详情", self.card_searcher.detail_cache.maintain)
 
         # 实例化 DeckBreakdownManager (传入 ydk_manager)
         self.deck_breakdown = DeckBreakdownManager(
-            str(self.data_dir), self.plugin_source_dir, self.ydk_manager
+            str(self.data_dir),
+            self.plugin_source_dir,
+            self.ydk_manager,
+            self.http,
+            self.card_searcher,
         )
         # 新增：决斗模拟器
-        self.duel_sim = DuelSimulator()
+        self.duel_sim = DuelSimulator(
+            max_games=self.config.get("duel_max_games", 2000),
+            idle_ttl=self.config.get("duel_idle_hours", 6) * 3600,
+            store=DuelStore(str(self.data_dir)),
+        )
+        # 对局定期批量写回磁盘 (抽卡时不直接写盘)，同时启动缓存清理
+        self._duel_flush_task: Optional[asyncio.Task] = None
+        self._ensure_background_tasks()
+        # 卡组变体批量模拟 (独立进程池，避免与绘图任务互相排队；第一次对比时才创建)
+        self.batch_sim = BatchSimulator(RenderPool(self.config.get("sim_workers", 0), name="模拟"))
         # 新增：禁限表管理器
-        self.banlist_manager = BanlistManager(str(self.data_dir))
+        self.banlist_manager = BanlistManager(str(self.data_dir), self.http)
         # 加载ID (从源码目录读取)
         self._load_card_ids()
 
+    DUEL_FLUSH_INTERVAL = 15
+    DUEL_COMPACT_INTERVAL = 3600
+    CACHE_MAX_AGE = 24 * 60 * 60
+
+    def _ensure_background_tasks(self):
+        """启动对局写回 / 缓存清理 / 名称索引构建任务 (构造时若没有运行中的事件循环，则在第一次开局时启动)"""
+        self.janitor.start()
+        self.card_searcher.start_name_index_build()
+        self.ydk_manager.thumb_cache.start_loading()
+        if self._duel_flush_task and not self._duel_flush_task.done():
+            return
+        try:
+            self._duel_flush_task = asyncio.get_running_loop().create_task(self._duel_flush_loop())
+        except RuntimeError:
+            self._duel_flush_task = None
+
+    async def _duel_flush_loop(self):
+        last_compact = time.monotonic()
+        while True:
+            await asyncio.sleep(self.DUEL_FLUSH_INTERVAL)
+            try:
+                self.duel_sim.flush()
+                if time.monotonic() - last_compact > self.DUEL_COMPACT_INTERVAL:
+                    last_compact = time.monotonic()
+                    removed = self.duel_sim.compact()
+                    if removed:
+                        logger.info(f"DuelStore: 已清理 {removed} 个闲置对局")
+            except Exception as e:
+                logger.warning(f"模拟对局写回失败: {e}")
+
     async def terminate(self): # <--- 必须加 async
         """插件卸载/关闭时的清理工作"""
-        # 关闭 aiohttp session
         if self.card_searcher:
             await self.card_searcher.close() # <--- 直接 await，确保资源释放
+        # 停止写回任务，并把未写回的对局落盘
+        if self._duel_flush_task:
+            self._duel_flush_task.cancel()
+        self.janitor.stop()
+        for task in self._prefetch_tasks.values():
+            task.cancel()
+        self._prefetch_tasks.clear()
+        self.duel_sim.flush()
+        if self.duel_sim.store:
+            self.duel_sim.store.close()
+        # 关闭绘图进程池 (如已启用)
+        await self.ydk_manager.close()
+        await self.batch_sim.pool.aclose()
+        # 关闭共享的 aiohttp session
+        await self.http.close()
 
     def _load_card_ids(self):
         """加载纯ID列表到内存"""
@@ -452,6 +691,18 @@ class DuelGalateaPlugin(Star):
         logger.warning(f"DuelGalatea: 无法识别会话 ID，使用 default。Obj: {obj}")
         return "default"
     
+    def _image_component(self, data: bytes, name: str):
+        """
+        图片字节 -> 消息组件
+        默认以 base64 直接发送；平台不支持时 (image_from_memory=false) 写入临时目录再按路径发送，由后台清理
+        """
+        if self.config.get("image_from_memory", True):
+            return Comp.Image.fromBytes(data)
+        path = os.path.join(self.ydk_manager.images_dir, f"{name}_{time.time_ns()}.jpg")
+        with open(path, "wb") as f:
+            f.write(data)
+        return Comp.Image.fromFileSystem(path)
+
     async def _send_card_detail(self, event: AstrMessageEvent, card_id: str, card_name_fallback: str = "未知"):
         """获取详情、更新缓存、拼接G点信息并发送"""
         user_id = getattr(event.message_obj, "sender_id", "unknown") # 获取用户ID用于缓存
@@ -467,7 +718,6 @@ class DuelGalateaPlugin(Star):
         self.last_viewed_cards[user_id] = {
             "card_id": str(card_id),
             "card_name": detail.get("cn_name", card_name_fallback),
-            "card_data": detail,
         }
 
         # 3. 格式化基础文本
@@ -484,12 +734,11 @@ class DuelGalateaPlugin(Star):
             formatted_detail += "\n" + " | ".join(tags)
 
         # 5. 下载图片并发送
+        # 直接转发 CDN 原始字节，不再解码 + 重新编码 + 写临时文件
         chain = []
-        local_img = await self.ydk_manager._download_image(self.card_searcher.session, str(card_id))
-        if local_img:
-            temp_path = os.path.join(self.ydk_manager.images_dir, f"temp_{card_id}.jpg")
-            local_img.save(temp_path)
-            chain.append(Comp.Image.fromFileSystem(temp_path))
+        image_bytes = await self.ydk_manager.fetch_card_image(str(card_id))
+        if image_bytes:
+            chain.append(self._image_component(image_bytes, f"card_{card_id}"))
         
         chain.append(Comp.Plain(formatted_detail))
         await event.send(event.chain_result(chain))
@@ -507,7 +756,7 @@ class DuelGalateaPlugin(Star):
             return
 
         query = " ".join(parts[1:])
-        result = await self.card_searcher.search_card(query)
+        result = await self.card_searcher.search_card_cached(query)
 
         if "error" in result:
             await event.send(event.plain_result(f"❌ 搜索出错: {result['error']}"))
@@ -522,17 +771,56 @@ class DuelGalateaPlugin(Star):
                 return
             # ==========================
 
-            self.search_sessions[user_id] = {
-                "results": results,
-                "current_page": 1,
-                "page_size": 10,
-                "query": query,
-            }
+            # 只记录查询词与结果卡密，结果列表由共享缓存持有
+            self.search_sessions[user_id] = SearchCursor(query, results)
             response_text = self.card_searcher.format_search_results(results, 1, user_id)
             await event.send(event.plain_result(response_text))
+            self._schedule_prefetch(user_id, results, 1)
         else:
             await event.send(event.plain_result("⚠️ 未找到与'{}'相关的卡片".format(query)))
 
+    async def _cursor_results(self, cursor: SearchCursor):
+        """取回翻页状态对应的结果 (共享缓存过期时按原查询词重新搜索)"""
+        result = await self.card_searcher.search_card_cached(cursor.query)
+        return result.get("result") or ()
+
+    def _schedule_prefetch(self, user_id: str, results, page: int):
+        """
+        [可选] 展示一页结果后，在后台预热该页卡片的详情与卡图缓存
+        同一用户再次搜索 / 翻页时取消上一次未完成的预取
+        """
+        previous = self._prefetch_tasks.pop(user_id, None)
+        if previous:
+            previous.cancel()
+        if not self.config.get("prefetch_search_results", False):
+            return
+
+        size = self.card_searcher.PAGE_SIZE
+        card_ids = [str(card["id"]) for card in results[(page - 1) * size: page * size] if card.get("id")]
+        if not card_ids:
+            return
+        task = asyncio.get_running_loop().create_task(self._prefetch_cards(card_ids))
+        self._prefetch_tasks[user_id] = task
+
+        def _done(finished: asyncio.Task):
+            if self._prefetch_tasks.get(user_id) is finished:
+                del self._prefetch_tasks[user_id]
+
+        task.add_done_callback(_done)
+
+    async def _prefetch_cards(self, card_ids: List[str]):
+        """逐张预取 (同一时间只有一张卡在请求中)，不与用户的正常请求抢占连接"""
+        for card_id in card_ids:
+            try:
+                await asyncio.gather(
+                    self.card_searcher.get_card_detail(card_id),
+                    self.ydk_manager.fetch_card_image(card_id),
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"预取卡片失败 {card_id}: {e}")
+
     @filter.command("查卡换页", alias={"/查卡换页"})
     async def handle_change_page(self, event: AstrMessageEvent):
         """切换到对应查卡页码"""
@@ -546,14 +834,20 @@ class DuelGalateaPlugin(Star):
             return
 
         page = int(page_str)
-        if user_id not in self.search_sessions:
+        cursor = self.search_sessions.get(user_id)
+        if cursor is None:
             await event.send(event.plain_result("没有正在进行的搜索会话"))
             return
 
-        session = self.search_sessions[user_id]
-        results = session["results"]
+        results = await self._cursor_results(cursor)
+        if not results:
+            await event.send(event.plain_result("搜索结果已失效，请重新搜索"))
+            return
+        # 重新搜索后结果可能变化，序号以本次展示的列表为准
+        self.search_sessions[user_id] = SearchCursor(cursor.query, results)
         response_text = self.card_searcher.format_search_results(results, page, user_id)
         await event.send(event.plain_result(response_text))
+        self._schedule_prefetch(user_id, results, page)
 
     @filter.command("查卡序号", alias={"/查卡序号"})
     async def handle_select_card(self, event: AstrMessageEvent):
@@ -568,19 +862,20 @@ class DuelGalateaPlugin(Star):
             return
 
         card_number = int(card_number_str)
-        if user_id not in self.search_sessions:
+        cursor = self.search_sessions.get(user_id)
+        if cursor is None:
             await event.send(event.plain_result("请先搜索卡片"))
             return
 
-        session = self.search_sessions[user_id]
-        results = session["results"]
+        if 1 <= card_number <= len(cursor.card_ids):
+            # 按展示时保存的卡密选卡；卡名只从共享缓存中取，不为此重新搜索
+            card_id = cursor.card_ids[card_number - 1]
+            cached = self.card_searcher.search_cache.get(cursor.query) or ()
+            card_name = next((card.get("cn_name") for card in cached if card.get("id") == card_id), "未知")
 
-        if 1 <= card_number <= len(results):
-            selected_card = results[card_number - 1]
-            
             # 这里会自动处理详情查询、G点显示、图片下载和缓存更新
-            await self._send_card_detail(event, selected_card["id"], selected_card.get("cn_name"))
-            
+            await self._send_card_detail(event, card_id, card_name)
+
         else:
             await event.send(event.plain_result("序号超出范围"))
 
@@ -591,13 +886,14 @@ class DuelGalateaPlugin(Star):
         parts = event.get_message_str().strip().split()
         card_id_str = parts[1] if len(parts) > 1 else ""
 
+        last_viewed = self.last_viewed_cards.get(user_id)
         if card_id_str:
             if not card_id_str.isdigit():
                 await event.send(event.plain_result("卡片密码必须是数字"))
                 return
             card_id = card_id_str
-        elif user_id in self.last_viewed_cards:
-            card_id = self.last_viewed_cards[user_id]["card_id"]
+        elif last_viewed:
+            card_id = last_viewed["card_id"]
         else:
             await event.send(event.plain_result("请先查看卡片详情"))
             return
@@ -616,19 +912,19 @@ class DuelGalateaPlugin(Star):
         user_id = getattr(event.message_obj, "sender_id", "unknown")
         
         # 1. 检查是否有缓存的卡片
-        if user_id not in self.last_viewed_cards:
+        card_info = self.last_viewed_cards.get(user_id)
+        if not card_info:
             await event.send(event.plain_result("⚠️ 请先使用 /查卡 或 /查卡序号 查看一张卡片。"))
             return
             
-        card_info = self.last_viewed_cards[user_id]
         card_id = card_info["card_id"]
         card_name = card_info["card_name"]
         
         await event.send(event.plain_result(f"🔍 正在查询【{card_name}】的收录信息..."))
         
-        # 2. 获取 HTML 并解析
-        html_text = await self.card_searcher.get_card_html(card_id)
-        packs = self.card_searcher.parse_card_packs(html_text)
+        # 2. 获取详情页解析结果 (卡盒与裁定共用同一份缓存)
+        page = await self.card_searcher.get_card_page(card_id)
+        packs = page.packs if page else []
         
         if not packs:
             await event.send(event.plain_result(f"📦【{card_name}】暂无卡盒收录信息或解析失败。"))
@@ -653,19 +949,19 @@ class DuelGalateaPlugin(Star):
         user_id = getattr(event.message_obj, "sender_id", "unknown")
         
         # 1. 检查缓存
-        if user_id not in self.last_viewed_cards:
+        card_info = self.last_viewed_cards.get(user_id)
+        if not card_info:
             await event.send(event.plain_result("⚠️ 请先使用 /查卡 或 /查卡序号 查看一张卡片。"))
             return
             
-        card_info = self.last_viewed_cards[user_id]
         card_id = card_info["card_id"]
         card_name = card_info["card_name"]
         
         await event.send(event.plain_result(f"🔍 正在查询【{card_name}】的官方裁定..."))
         
-        # 2. 获取 HTML 并解析
-        html_text = await self.card_searcher.get_card_html(card_id)
-        faqs = self.card_searcher.parse_card_faq(html_text)
+        # 2. 获取详情页解析结果 (卡盒与裁定共用同一份缓存)
+        page = await self.card_searcher.get_card_page(card_id)
+        faqs = page.faq if page else []
         
         if not faqs:
             await event.send(event.plain_result(f"⚖️【{card_name}】暂无收录的官方裁定(Q&A)。"))
@@ -720,7 +1016,6 @@ class DuelGalateaPlugin(Star):
                     self.last_viewed_cards[user_id] = {
                         "card_id": str(random_card_id),
                         "card_name": detail_result.get("cn_name", "未知"),
-                        "card_data": detail_result,
                     }
                     return  # 成功则退出
             except Exception as e:
@@ -979,12 +1274,11 @@ class DuelGalateaPlugin(Star):
     async def handle_send_ydk(self, event: AstrMessageEvent):
         """发送用户缓存的ydk文件"""
         session_id = self._get_session_id(event)
-        # 动态拼接路径
-        path = os.path.join(self.ydk_manager.cache_dir, f"deck_{session_id}.ydk")
-        path = os.path.abspath(path)
+        # 卡组存放在数据库中，发送时才导出为 .ydk 文件
+        path = self.ydk_manager.export_ydk_file(session_id)
 
-        if os.path.exists(path):
-            file_name = f"{session_id}.ydk"  # 或者保留 deck_xxx.ydk
+        if path:
+            path = os.path.abspath(path)
             await event.send(
                 event.chain_result([Comp.File(name=os.path.basename(path), file=path)])
             )
@@ -995,10 +1289,8 @@ class DuelGalateaPlugin(Star):
     async def handle_send_deck_image(self, event: AstrMessageEvent):
         """发送用户缓存的ydk文件的卡组构筑图片"""
         session_id = self._get_session_id(event)
-        # 检查文件是否存在
-        ydk_path = os.path.join(self.ydk_manager.cache_dir, f"deck_{session_id}.ydk")
-
-        if not os.path.exists(ydk_path):
+        # 检查是否有缓存卡组
+        if not self.ydk_manager.has_deck(session_id):
             await event.send(event.plain_result("⚠️ 当前会话无缓存数据"))
             return
 
@@ -1021,16 +1313,20 @@ class DuelGalateaPlugin(Star):
             return
 
         ydk_content = parts[1]
-        main, extra, side = self.ydk_manager.parse_ydk(ydk_content)
+        try:
+            deck = self.ydk_manager.parse_ydk(ydk_content)
+        except Exception as e:
+            await event.send(event.plain_result(f"❌ 解析出错: {e}"))
+            return
 
-        if not main and not extra:
+        if not deck:
             await event.send(event.plain_result("⚠️ 未识别到有效的卡密内容"))
             return
 
-        path = self.ydk_manager.save_ydk(main, extra, side, session_id)
+        path = self.ydk_manager.save_ydk(deck, session_id)
         await event.send(
             event.plain_result(
-                f" YDK 已接收 (M:{len(main)} E:{len(extra)} S:{len(side)})。你可以使用 /发送卡组图片 查看。"
+                f" YDK 已接收 ({deck.summary()})。你可以使用 /发送卡组图片 查看。"
             )
         )
 
@@ -1044,7 +1340,7 @@ class DuelGalateaPlugin(Star):
         parts = text.split()
         url = parts[1] if len(parts) > 1 else text  # 兼容两种输入方式
 
-        main, extra, side = [], [], []
+        deck = Deck()
         source_type = ""
 
         await event.send(event.plain_result("🔍 正在解析链接..."))
@@ -1053,12 +1349,12 @@ class DuelGalateaPlugin(Star):
         if url.startswith("ydke://"):
             # 处理 YDKe
             source_type = "YDKe"
-            main, extra, side = self.ydk_manager.parse_ydke_url(url)
+            deck = self.ydk_manager.parse_ydke_url(url)
         elif "deck.ourygo.top" in url and "d=" in url:
             # 处理 Ourocg
             source_type = "Ourocg"
             try:
-                main, extra, side = self.ydk_manager.parse_ourocg_url(url)
+                deck = self.ydk_manager.parse_ourocg_url(url)
             except Exception as e:
                 await event.send(event.plain_result(f"❌ 解析出错: {e}"))
                 return
@@ -1071,17 +1367,17 @@ class DuelGalateaPlugin(Star):
             return
 
         # === 结果处理 ===
-        if not main and not extra:
+        if not deck:
             await event.send(event.plain_result("❌ 解析结果为空，请检查链接是否有效"))
             return
 
         # 2. 保存 YDK
-        ydk_path = self.ydk_manager.save_ydk(main, extra, side, session_id)
+        ydk_path = self.ydk_manager.save_ydk(deck, session_id)
 
         # 3. 生成图片
         await event.send(
             event.plain_result(
-                f"✅ [{source_type}] 解析成功 (M:{len(main)} E:{len(extra)} S:{len(side)})\n🎨 正在绘图..."
+                f"✅ [{source_type}] 解析成功 ({deck.summary()})\n🎨 正在绘图..."
             )
         )
         img_path = await self.ydk_manager.draw_deck_image(
@@ -1097,6 +1393,27 @@ class DuelGalateaPlugin(Star):
                 )
             )
 
+    @filter.command("导出卡组链接", alias=["/导出卡组链接", "卡组链接", "/卡组链接"])
+    async def handle_export_deck_link(self, event: AstrMessageEvent):
+        """将当前缓存的 YDK 导出为分享链接"""
+        session_id = self._get_session_id(event)
+        deck = self.ydk_manager.load_last_ydk(session_id)
+        if not deck:
+            await event.send(event.plain_result("⚠️ 当前没有缓存的卡组，请先发送 YDK 或卡组链接。"))
+            return
+
+        lines = [f"🔗 卡组链接 ({deck.summary()})"]
+        url = self.ydk_manager.build_ourocg_url(deck)
+        if url:
+            lines.append(f"Ourocg: {url}")
+        ydke = self.ydk_manager.build_ydke_url(deck)
+        if ydke:
+            lines.append(f"YDKe: {ydke}")
+        if len(lines) == 1:
+            await event.send(event.plain_result("❌ 卡组无法编码为分享链接 (卡密无效)。"))
+            return
+        await event.send(event.plain_result("\n".join(lines)))
+
     # ================= 决斗模拟器指令 (v1.4.0) =================
 
     @filter.command("卡组转存", alias=["/卡组转存"])
@@ -1140,8 +1457,7 @@ class DuelGalateaPlugin(Star):
         group_session = f"group_{group_id}"
         
         # 检查自己有没有卡组
-        user_ydk_path = os.path.join(self.ydk_manager.cache_dir, f"deck_{user_session}.ydk")
-        if not os.path.exists(user_ydk_path):
+        if not self.ydk_manager.has_deck(user_session):
             await event.send(event.plain_result("⚠️ 您的私人仓库为空，无法分享。请先导入一套卡组。"))
             return
 
@@ -1168,34 +1484,35 @@ class DuelGalateaPlugin(Star):
         user_session = f"user_{sender_id}"
 
         # 2. 尝试读取私人 YDK
-        main, _, _ = self.ydk_manager.load_last_ydk(user_session)
+        deck = self.ydk_manager.load_last_ydk(user_session)
         
         # 3. 如果私人没卡组，尝试自动从群聊获取
-        if not main:
+        if not deck.main:
             group_id = getattr(event.message_obj, "group_id", None)
             if group_id:
                 group_session = f"group_{group_id}"
                 # 尝试复制 群 -> 私
                 if self.ydk_manager.copy_ydk_from_session(group_session, user_session):
                     # 复制成功后，重新读取私人 YDK
-                    main, _, _ = self.ydk_manager.load_last_ydk(user_session)
+                    deck = self.ydk_manager.load_last_ydk(user_session)
                     await event.send(event.plain_result("💡 检测到您没有私人卡组，已自动载入当前群聊卡组。"))
         
         # 4. 还是没有（私没有，且群也没有/不在群）
-        if not main:
+        if not deck.main:
             await event.send(event.plain_result(f"⚠️ 无法启动决斗。\n请先导入卡组（私聊发送YDK），或者等待群友分享卡组。"))
             return
             
         # 5. 初始化并抽卡
-        self.duel_sim.init_duel(user_key, main)
+        self.duel_sim.init_duel(user_key, deck)
+        self._ensure_background_tasks()
         hand = self.duel_sim.draw_card(user_key, 5)
         
         # 6. 绘图与发送
-        img_path = await self.ydk_manager.draw_cards_image(hand, f"Starting Hand ({len(hand)})")
+        img_bytes = await self.ydk_manager.draw_cards_image(hand, f"Starting Hand ({len(hand)})")
         
-        chain = [Comp.Plain(f"🎲 决斗开始！卡组已重置 (Main: {len(main)})\n已抽取起手 5 张：")]
-        if img_path:
-            chain.append(Comp.Image.fromFileSystem(img_path))
+        chain = [Comp.Plain(f"🎲 决斗开始！卡组已重置 (Main: {len(deck.main)})\n已抽取起手 5 张：")]
+        if img_bytes:
+            chain.append(self._image_component(img_bytes, "hand"))
         await event.send(event.chain_result(chain))
 
     @filter.command("卡组抽卡", alias=["/卡组抽卡"])
@@ -1211,7 +1528,7 @@ class DuelGalateaPlugin(Star):
         if not state:
             await event.send(event.plain_result("⚠️ 请先发送 /卡组起手 开始新对局"))
             return
-        if not state["deck"]:
+        if not state.deck_count:
             await event.send(event.plain_result("⚠️ 卡组已经抽干了！(Deck Out)"))
             return
             
@@ -1224,11 +1541,11 @@ class DuelGalateaPlugin(Star):
         name = detail.get("cn_name", "未知卡片")
         
         # 绘图
-        img_path = await self.ydk_manager.draw_cards_image(drawn, f"Draw: {name}")
+        img_bytes = await self.ydk_manager.draw_cards_image(drawn, f"Draw: {name}")
         
-        chain = [Comp.Plain(f"🎴 抽牌！\n{name}\n剩余卡组: {len(state['deck'])}")]
-        if img_path:
-            chain.append(Comp.Image.fromFileSystem(img_path))
+        chain = [Comp.Plain(f"🎴 抽牌！\n{name}\n剩余卡组: {state.deck_count}")]
+        if img_bytes:
+            chain.append(self._image_component(img_bytes, "hand"))
         await event.send(event.chain_result(chain))
 
     @filter.command("卡组检索", alias=["/卡组检索"])
@@ -1250,14 +1567,14 @@ class DuelGalateaPlugin(Star):
         if not state:
             await event.send(event.plain_result("⚠️ 请先发送 /卡组起手"))
             return
-        if not state["deck"]:
+        if not state.deck_count:
             await event.send(event.plain_result("⚠️ 卡组为空。"))
             return
 
         await event.send(event.plain_result(f"🔍 正在检索【{query}】..."))
 
         # 1. 查卡获取 ID
-        search_res = await self.card_searcher.search_card(query)
+        search_res = await self.card_searcher.search_card_cached(query)
         if "error" in search_res or not search_res.get("result"):
              await event.send(event.plain_result("❌ 未找到该卡片信息。"))
              return
@@ -1280,10 +1597,10 @@ class DuelGalateaPlugin(Star):
             self.duel_sim.remove_from_deck_to_hand(user_key, target_id)
             
             # 4. 展示
-            img_path = await self.ydk_manager.draw_cards_image([target_id], f"Search: {target_name}")
-            chain = [Comp.Plain(f"✅ 检索成功：【{target_name}】加入手牌。\n剩余卡组: {len(state['deck'])}")]
-            if img_path:
-                chain.append(Comp.Image.fromFileSystem(img_path))
+            img_bytes = await self.ydk_manager.draw_cards_image([target_id], f"Search: {target_name}")
+            chain = [Comp.Plain(f"✅ 检索成功：【{target_name}】加入手牌。\n剩余卡组: {state.deck_count}")]
+            if img_bytes:
+                chain.append(self._image_component(img_bytes, "hand"))
             await event.send(event.chain_result(chain))
         else:
             await event.send(event.plain_result(f"⚠️ 卡组中没有【{query}】(或已全部上手)。"))
@@ -1301,16 +1618,213 @@ class DuelGalateaPlugin(Star):
             await event.send(event.plain_result("⚠️ 未进行对局。"))
             return
             
-        hand = state["hand"]
-        deck_count = len(state["deck"])
+        hand = state.hand
+        deck_count = state.deck_count
         
-        img_path = await self.ydk_manager.draw_cards_image(hand, f"Hand ({len(hand)}) | Deck: {deck_count}")
+        img_bytes = await self.ydk_manager.draw_cards_image(hand, f"Hand ({len(hand)}) | Deck: {deck_count}")
         
         chain = [Comp.Plain(f"📊 当前状态\n🎴 手牌: {len(hand)} 张\n📚 卡组: {deck_count} 张")]
-        if img_path:
-            chain.append(Comp.Image.fromFileSystem(img_path))
+        if img_bytes:
+            chain.append(self._image_component(img_bytes, "hand"))
         await event.send(event.chain_result(chain))
 
+    @filter.command("起手概率", alias=["/起手概率"])
+    async def handle_hand_probability(self, event: AstrMessageEvent):
+        """
+        计算当前卡组的起手概率。
+        用法: /起手概率 卡名A,卡名B | 卡名C*2 [后攻]
+        `|` 分隔卡组 (需同时满足)，`,` 分隔同组卡片 (任意一张即可)，`*N` 表示该组至少 N 张
+        """
+        sender_id = getattr(event.message_obj, "sender_id", None)
+        if not sender_id and hasattr(event.message_obj, "sender"):
+             sender_id = getattr(event.message_obj.sender, "user_id", None)
+        if not sender_id:
+             await event.send(event.plain_result("❌ 无法获取用户身份。"))
+             return
+
+        parts = event.get_message_str().strip().split(maxsplit=1)
+        if len(parts) < 2:
+            await event.send(event.plain_result(
+                "用法: /起手概率 卡名A,卡名B | 卡名C*2 [后攻]\n"
+                "例如: /起手概率 灰流丽,增殖的G (先攻5张至少1张手坑)"
+            ))
+            return
+        args = parts[1].strip()
+        hand_size = 5
+        for tag in ("后攻", "后手"):
+            if args.endswith(tag):
+                hand_size, args = 6, args[: -len(tag)].strip()
+
+        main = self._load_sim_deck(event, sender_id)
+        if len(main) < hand_size:
+            await event.send(event.plain_result("⚠️ 未找到卡组或主卡组不足起手张数，请先导入卡组（私聊发送YDK）。"))
+            return
+
+        groups = await self._parse_hand_groups(event, args, set(main))
+        if not groups:
+            return
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, hand_probability.evaluate, main, groups, hand_size)
+
+        turn = "后攻" if hand_size == 6 else "先攻"
+        lines = [f"🎲 起手概率 ({turn} {hand_size} 张 / 主卡组 {len(main)} 张)"]
+        for g, (name, p) in zip(groups, result["groups"]):
+            need = f" (至少{g.min_count}张)" if g.min_count > 1 else ""
+            lines.append(f"• {name}{need}: {p * 100:.2f}%")
+        if len(groups) > 1 or result["exact"] is None:
+            if result["exact"] is not None:
+                lines.append(f"✅ 同时满足: {result['exact'] * 100:.2f}%")
+            else:
+                mc = result["mc"]
+                low, high = mc["ci"]
+                lines.append(
+                    f"✅ 同时满足: {mc['rate'] * 100:.2f}% "
+                    f"(95%置信区间 {low * 100:.2f}%~{high * 100:.2f}%，模拟 {mc['trials']:,} 次)"
+                )
+        await event.send(event.plain_result("\n".join(lines)))
+
+    def _load_sim_deck(self, event: AstrMessageEvent, sender_id) -> List[str]:
+        """读取概率计算用的主卡组：优先私人卡组，其次当前群卡组 (只读，不复制)"""
+        deck = self.ydk_manager.load_last_ydk(f"user_{sender_id}")
+        if not deck.main:
+            group_id = getattr(event.message_obj, "group_id", None)
+            if group_id:
+                deck = self.ydk_manager.load_last_ydk(f"group_{group_id}")
+        return deck.main_ids()
+
+    async def _resolve_card_ids(self, name: str, deck_ids: Optional[set] = None) -> List[str]:
+        """
+        卡名 -> 卡密
+        指定 deck_ids 时只返回卡组中实际存在的卡密 (同名多版本全部返回)，否则返回最佳匹配的一个
+        """
+        if name.isdigit() and (deck_ids is None or name in deck_ids):
+            return [name]
+        search_res = await self.card_searcher.search_card_cached(name)
+        found = [str(card["id"]) for card in search_res.get("result", []) if card.get("id")]
+        if deck_ids is None:
+            return found[:1]
+        return [cid for cid in found if cid in deck_ids]
+
+    async def _parse_hand_groups(self, event: AstrMessageEvent, args: str, deck_ids: set) -> Optional[List[HandGroup]]:
+        """解析 `A,B | C*2` 形式的卡片分组，失败时直接回复并返回 None"""
+        groups: List[HandGroup] = []
+        for raw_group in args.split("|"):
+            raw_group = raw_group.strip()
+            if not raw_group:
+                continue
+            min_count = 1
+            m = re.search(r"\*\s*(\d+)$", raw_group)
+            if m:
+                min_count = max(1, int(m.group(1)))
+                raw_group = raw_group[: m.start()].strip()
+
+            card_ids = set()
+            for name in re.split(r"[,，、]", raw_group):
+                name = name.strip()
+                if not name:
+                    continue
+                found = await self._resolve_card_ids(name, deck_ids)
+                if not found:
+                    await event.send(event.plain_result(f"⚠️ 卡组中没有【{name}】。"))
+                    return None
+                card_ids.update(found)
+            groups.append(HandGroup(raw_group, card_ids, min_count))
+
+        if not groups:
+            await event.send(event.plain_result("⚠️ 请至少指定一组卡片。"))
+            return None
+        return groups
+
+    @filter.command("卡组对比", alias=["/卡组对比"])
+    async def handle_deck_compare(self, event: AstrMessageEvent):
+        """
+        多个卡组变体的起手 / 抽卡概率对比 (多进程批量模拟)。
+        用法 (第一行为分组，之后每行一个变体，+卡名 加一张，-卡名 减一张):
+        /卡组对比 动点A,动点B | 灰流丽 回合3
+        +动点A
+        -灰流丽 +增殖的G
+        """
+        sender_id = getattr(event.message_obj, "sender_id", None)
+        if not sender_id and hasattr(event.message_obj, "sender"):
+             sender_id = getattr(event.message_obj.sender, "user_id", None)
+        if not sender_id:
+             await event.send(event.plain_result("❌ 无法获取用户身份。"))
+             return
+        if not hand_probability.HAS_NUMPY:
+            await event.send(event.plain_result("⚠️ 批量模拟需要安装 numpy。"))
+            return
+
+        lines = [l.strip() for l in event.get_message_str().strip().splitlines() if l.strip()]
+        first = lines[0].split(maxsplit=1) if lines else []
+        if len(first) < 2:
+            await event.send(event.plain_result(
+                "用法: /卡组对比 卡名A,卡名B | 卡名C [后攻] [回合N]\n"
+                "之后每行一个变体，例如:\n+卡名A\n-卡名C +卡名D"
+            ))
+            return
+        args = first[1]
+        hand_size, turns = 5, 1
+        m = re.search(r"回合\s*(\d+)", args)
+        if m:
+            turns = min(max(1, int(m.group(1))), 10)
+            args = (args[: m.start()] + args[m.end():]).strip()
+        for tag in ("后攻", "后手"):
+            if tag in args:
+                hand_size, args = 6, args.replace(tag, "").strip()
+
+        main = self._load_sim_deck(event, sender_id)
+        if len(main) < hand_size:
+            await event.send(event.plain_result("⚠️ 未找到卡组或主卡组不足起手张数，请先导入卡组（私聊发送YDK）。"))
+            return
+
+        # 变体：在当前卡组基础上增减卡片 (空格分隔，卡名内可含 "-")
+        variants = [DeckVariant("当前卡组", main)]
+        for line in lines[1:6]:
+            deck = list(main)
+            for token in line.split():
+                sign, name = token[0], token[1:].strip()
+                if sign not in "+-" or not name:
+                    await event.send(event.plain_result(f"⚠️ 无法识别【{token}】，请使用 +卡名 或 -卡名。"))
+                    return
+                if sign == "-":
+                    found = await self._resolve_card_ids(name, set(deck))
+                    if not found:
+                        await event.send(event.plain_result(f"⚠️ 卡组中没有【{name}】，无法减少。"))
+                        return
+                    deck.remove(found[0])
+                else:
+                    found = await self._resolve_card_ids(name, set(deck)) or await self._resolve_card_ids(name)
+                    if not found:
+                        await event.send(event.plain_result(f"❌ 未找到卡片【{name}】。"))
+                        return
+                    deck.append(found[0])
+            variants.append(DeckVariant(line, deck))
+
+        # 分组按所有变体的卡片解析，变体新加入的卡也会计入所属分组
+        all_ids = set().union(*(v.main for v in variants))
+        groups = await self._parse_hand_groups(event, args, all_ids)
+        if not groups:
+            return
+
+        await event.send(event.plain_result(f"⏳ 正在模拟 {len(variants)} 个变体..."))
+        try:
+            result = await self.batch_sim.compare(variants, groups, hand_size, turns)
+        except Exception as e:
+            logger.error(f"批量模拟失败: {e}")
+            await event.send(event.plain_result(f"❌ 模拟失败: {e}"))
+            return
+
+        turn = "后攻" if hand_size == 6 else "先攻"
+        out = [f"📊 卡组对比 ({turn}，每个变体模拟 {result['trials']:,} 局)"]
+        for v in result["variants"]:
+            out.append(f"【{v['name']}】({v['deck_size']} 张)")
+            for t, st in enumerate(v["turns"], start=1):
+                low, high = st["ci"]
+                half = (high - low) / 2 * 100
+                out.append(f"  回合{t}: {st['rate'] * 100:.2f}% ±{half:.2f}%")
+        await event.send(event.plain_result("\n".join(out)))
+
     @filter.command("卡组状态重置", alias=["/卡组状态重置", "/重置决斗", "/重置卡组" , "重置决斗", "重置卡组"])
     async def handle_sim_reset(self, event: AstrMessageEvent):
         """
@@ -1329,18 +1843,19 @@ class DuelGalateaPlugin(Star):
         user_session = f"user_{sender_id}"
 
         # 2. 重新读取私有 YDK (作为重置的基准)
-        main, _, _ = self.ydk_manager.load_last_ydk(user_session)
+        deck = self.ydk_manager.load_last_ydk(user_session)
         
-        if not main:
+        if not deck.main:
             await event.send(event.plain_result("⚠️ 您没有正在使用的私有卡组，无法重置。\n请先使用 /卡组起手 或 /卡组转存。"))
             return
 
         # 3. 初始化模拟器 (这就相当于重置了)
-        # init_duel 会把传入的 main 列表作为新卡组，并清空手牌
-        self.duel_sim.init_duel(user_key, main)
+        # init_duel 会把传入卡组的主卡组作为新卡组，并清空手牌
+        self.duel_sim.init_duel(user_key, deck)
+        self._ensure_background_tasks()
         
         # 4. 反馈
-        await event.send(event.plain_result(f"🔄 状态已重置！\n手牌已清空，所有卡片({len(main)}张)已洗回卡组。\n您可以发送 /卡组抽卡 开始操作。"))
+        await event.send(event.plain_result(f"🔄 状态已重置！\n手牌已清空，所有卡片({len(deck.main)}张)已洗回卡组。\n您可以发送 /卡组抽卡 开始操作。"))
 
     @filter.command("禁卡表更新", alias=["/禁卡表更新", "/更新禁卡表", "更新禁卡表"])
     async def handle_banlist_update(self, event: AstrMessageEvent):
@@ -1373,6 +1888,9 @@ class DuelGalateaPlugin(Star):
             await event.send(event.plain_result(f"❌ {info}"))
             return
 
+        # 禁卡表已刷新，旧的卡片详情缓存随之失效
+        self.card_searcher.invalidate_detail_cache()
+
         result_msg = [f"✅ {target_name} 禁卡表 {info}"]
         
         if changes:
@@ -1406,12 +1924,12 @@ class DuelGalateaPlugin(Star):
              sender_id = getattr(event.message_obj.sender, "user_id", None)
         user_session = f"user_{sender_id}"
         
-        main, extra, side = self.ydk_manager.load_last_ydk(user_session)
-        if not main:
+        deck = self.ydk_manager.load_last_ydk(user_session)
+        if not deck.main:
             await event.send(event.plain_result("⚠️ 未找到卡组。"))
             return
 
-        res = self.banlist_manager.check_deck_legality(target_env, main, extra, side)
+        res = self.banlist_manager.check_deck_legality(target_env, deck)
         
         lines = [f"📊 卡组检查报告 ({env_display}环境)"]
         
@@ -1453,6 +1971,9 @@ class DuelGalateaPlugin(Star):
             await event.send(event.plain_result(f"❌ {msg}"))
             return
 
+        # Genesys 数据已刷新，旧的卡片详情缓存随之失效
+        self.card_searcher.invalidate_detail_cache()
+
         # 构建详细报告
         lines = [f"✅ {msg}", "", "📊 收录样本 (前15条):"]
         
@@ -1469,6 +1990,142 @@ class DuelGalateaPlugin(Star):
             
         await event.send(event.plain_result("\n".join(lines)))
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("卡库导入", alias=["/卡库导入"])
+    async def handle_card_db_import(self, event: AstrMessageEvent):
+        """
+        导入百鸽全卡数据到本地离线卡库。
+        用法: /卡库导入 [文件路径] (默认读取插件目录或数据目录下的 cards.json)
+        """
+        parts = event.get_message_str().strip().split(maxsplit=1)
+        if len(parts) > 1:
+            candidates = [parts[1]]
+        else:
+            candidates = [
+                os.path.join(self.plugin_source_dir, "cards.json"),
+                os.path.join(str(self.data_dir), "cards.json"),
+            ]
+
+        dump_path = next((p for p in candidates if os.path.exists(p)), None)
+        if not dump_path:
+            await event.send(event.plain_result("⚠️ 未找到 cards.json，请先将百鸽全卡数据放到插件目录下。"))
+            return
+
+        await event.send(event.plain_result("⏳ 正在导入本地卡库..."))
+        try:
+            loop = asyncio.get_running_loop()
+            count = await loop.run_in_executor(
+                None, self.card_searcher.local_db.import_dump, dump_path
+            )
+            await self.card_searcher.rebuild_name_index()
+        except Exception as e:
+            logger.error(f"卡库导入失败: {e}")
+            await event.send(event.plain_result(f"❌ 导入失败: {e}"))
+            return
+
+        await event.send(event.plain_result(f"✅ 本地卡库导入完成，共 {count} 张卡片。"))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("重载字体", alias=["/重载字体"])
+    async def handle_font_reload(self, event: AstrMessageEvent):
+        """更换插件目录下的字体文件后，重新加载绘图字体"""
+        if not self.ydk_manager.fonts:
+            await event.send(event.plain_result("⚠️ 未安装 Pillow，无法绘图。"))
+            return
+        font_path = self.ydk_manager.fonts.reload()
+        if font_path:
+            await event.send(event.plain_result(f"✅ 已重新加载字体: {os.path.basename(font_path)}"))
+        else:
+            await event.send(event.plain_result("⚠️ 插件目录下未找到字体文件，将使用默认字体。"))
+
+    @filter.command("缓存统计", alias=["/缓存统计"])
+    async def handle_cache_stats(self, event: AstrMessageEvent):
+        """查看插件各级缓存的命中情况"""
+        lines = ["📈 缓存统计"]
+
+        local_db = self.card_searcher.local_db
+        if local_db and local_db.available:
+            index = self.card_searcher.name_index
+            if index:
+                index_info = f"索引 {len(index)} 张"
+            elif self.card_searcher.index_building:
+                index_info = "索引构建中"
+            else:
+                index_info = "索引未构建"
+            lines.append(f"• 本地卡库: {local_db.card_count} 张 ({index_info})")
+        else:
+            lines.append("• 本地卡库: 未导入 (使用在线 API)")
+
+        if self.card_searcher.detail_cache:
+            st = self.card_searcher.detail_cache.stats()
+            lines.append(
+                f"• 卡片详情: 内存 {st['size']}/{st['maxsize']} "
+                f"命中 {st['hits']} | 磁盘命中 {st['disk_hits']} | 未命中 {st['disk_misses']}"
+            )
+
+        st = self.ydk_manager.thumb_cache.stats()
+        lines.append(
+            f"• 卡图缓存: {st['entries']} 张 ({st['bytes'] // 1024 // 1024}MB/{st['max_bytes'] // 1024 // 1024}MB) "
+            f"命中 {st['hits']} | 未命中 {st['misses']}"
+        )
+
+        st = self.card_searcher.search_cache.stats()
+        lines.append(
+            f"• 查卡结果: {st['size']}/{st['maxsize']} 条 命中 {st['hits']} | 未命中 {st['misses']}"
+        )
+
+        st = self.card_searcher.page_cache.stats()
+        lines.append(
+            f"• 卡盒/裁定: {st['size']}/{st['maxsize']} 张 命中 {st['hits']} | "
+            f"重新验证 {st['revalidated']} | 重新下载 {st['refetched']} | 未命中 {st['misses']}"
+        )
+
+        for label, sessions in (("翻页会话", self.search_sessions), ("最近查看", self.last_viewed_cards)):
+            st = sessions.stats()
+            lines.append(
+                f"• {label}: {st['size']}/{st['maxsize']} 人 (约 {st['bytes'] // 1024}KB) "
+                f"过期 {st['expired']} | 淘汰 {st['evictions']}"
+            )
+
+        st = self.ydk_manager.image_fetcher.stats()
+        lines.append(f"• 卡图下载: 合并重复请求 {st['coalesced']} 次，进行中 {st['inflight']}")
+        for host, hs in st["hosts"].items():
+            lines.append(
+                f"  - {host}: 请求 {hs['requests']} | 失败 {hs['failures']} | 重试 {hs['retries']} "
+                f"| 平均 {hs['avg_ms']}ms 最大 {hs['max_ms']}ms"
+            )
+
+        st = self.ydk_manager.tile_cache.stats()
+        lines.append(
+            f"• 卡图瓦片: {st['entries']} 张 ({st['bytes'] // 1024 // 1024}MB/{st['max_bytes'] // 1024 // 1024}MB) "
+            f"命中 {st['hits']} | 未命中 {st['misses']} | 淘汰 {st['evictions']}"
+        )
+
+        st = self.ydk_manager.render_cache.stats()
+        lines.append(
+            f"• 构筑图: {st['entries']}/{st['max_entries']} 张 命中 {st['hits']} | 未命中 {st['misses']}"
+        )
+
+        st = self.ydk_manager.deck_store.stats()
+        lines.append(
+            f"• 会话卡组: {st['sessions']} 个会话 / {st['decks']} 套卡组 "
+            f"(内存 {st['cached']}) 命中 {st['hits']} | 未命中 {st['misses']}"
+        )
+
+        st = self.janitor.stats()
+        lines.append(
+            f"• 缓存清理: 已运行 {st['runs']} 轮，共清理 {st['freed_files']} 个文件 "
+            f"({st['freed_bytes'] // 1024 // 1024}MB)"
+        )
+
+        st = self.duel_sim.stats()
+        lines.append(
+            f"• 模拟对局: {st['games']}/{st['max_games']} 局 (约 {st['bytes'] // 1024}KB) 已清除 {st['evictions']} | "
+            f"已保存 {st['stored']} 局，待写回 {st['dirty']}，重启后恢复 {st['rehydrated']}"
+        )
+
+        await event.send(event.plain_result("\n".join(lines)))
+
     # ================= 帮助指令 =================
 
     @filter.command("游戏王帮助", alias=["/游戏王帮助", "游戏王指令", "/游戏王指令", "duelhelp", "/duelhelp"])
@@ -1492,11 +2149,14 @@ class DuelGalateaPlugin(Star):
             "• `/卡组起手` : 模拟起手5张 (优先私有，其次群组)",
             "• `/卡组抽卡` : 模拟抽1张",
             "• `/卡组检索 <卡名>` : 检索特定卡片上手(模糊检索)",
+            "• `/起手概率 A,B | C [后攻]` : 计算起手同时拿到各组卡片的概率",
+            "• `/卡组对比 A | B [回合N]` : 换行写变体(+卡名/-卡名)，批量模拟对比各版本概率",
             "• `/卡组状态` : 查看手牌/卡组余量",
             "• `/卡组状态重置` : 洗牌并重置",
             "",
             "💾 **卡组管理**",
             "• `/接收卡组链接 <链接>` : 解析 Ourocg/YDKe 链接作为卡组缓存",
+            "• `/导出卡组链接` : 将缓存的卡组导出为 Ourocg / YDKe 链接",
             "• `/接收ydk文本` : (粘贴纯文本内容) 解析ydk文本并作为卡组缓存",
             "• `/发送ydk` : 发送当前缓存的 YDK 文件",
             "• `/发送卡组图片` : 生成当前卡组的构筑图",
@@ -1517,6 +2177,9 @@ class DuelGalateaPlugin(Star):
             "🚫 **禁卡表与规则**",
             "• `/禁卡表更新 [OCG/简中]` : 同步[OCG/简中]官方禁卡表",
             "• `/Genesys更新` : 同步 Genesys 构筑点数",
+            "• `/缓存统计` : 查看查卡缓存命中情况",
+            "• `/卡库导入 [路径]` : (管理员) 导入百鸽全卡数据作为离线卡库",
+            "• `/重载字体` : (管理员) 更换字体文件后重新加载",
             "================================",
             "💡 **提示**",
             "1. 卡组管理支持会话隔离：私聊是个人仓库，群聊是公共仓库，可用转存/分享流转。",
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from astrbot.api.all import logger
+
+
+class RenderPool:
+    """
+    可选的多进程绘图后端
+    - workers > 0 时使用进程池，多个群同时绘图可以利用多核，不再争抢 GIL
+    - workers = 0 或进程池异常时返回 None，由调用方回退到线程池绘图
+    - 卡组对比的批量模拟也复用本类 (name 仅用于日志)
+    - 进程池在第一次提交任务时才创建，插件加载时不启动子进程
+    """
+
+    def __init__(self, workers: int = 0, name: str = "绘图"):
+        self.workers = workers
+        self.name = name
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 创建失败 / 损坏 / 已关闭后不再创建进程池
+        self._disabled = workers <= 0
+
+    @property
+    def enabled(self) -> bool:
+        return not self._disabled
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and not self._disabled:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                logger.info(f"RenderPool: 已启用多进程{self.name} ({self.workers} 个进程)")
+            except Exception as e:
+                logger.warning(f"RenderPool: 进程池创建失败，{self.name}改在线程中执行: {e}")
+                self._disabled = True
+        return self._executor
+
+    async def submit(self, func: Callable, *args) -> Optional[Any]:
+        """在进程池中执行任务，失败返回 None (进程池损坏时同时关闭)"""
+        executor = self._get_executor()
+        if not executor:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool as e:
+            # 进程池损坏 (子进程崩溃等)，后续请求一律回退到线程
+            logger.warning(f"RenderPool: 进程池已损坏，{self.name}改在线程中执行: {e}")
+            self.shutdown(wait=False)
+            return None
+        except Exception as e:
+            logger.warning(f"RenderPool: 进程{self.name}失败，本次回退到线程: {e}")
+            return None
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池 (wait=True 时阻塞等待子进程退出，事件循环中请使用 aclose)"""
+        self._disabled = True
+        executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def aclose(self):
+        """关闭进程池，在线程池中等待子进程退出，不阻塞事件循环"""
+        self._disabled = True
+        executor, self._executor = self._executor, None
+        if executor:
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(executor.shutdown, wait=True, cancel_futures=True)
+            )
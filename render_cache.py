@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from astrbot.api.all import logger
+
+
+class RenderCache:
+    """
+    卡组构筑图渲染缓存
+    - 以 (主卡组, 额外, 副卡组, 标题, 布局版本, 字体) 的规范化哈希为键，/重载字体 后旧图自然失效
+    - 卡组未变化时直接返回已有图片，无需重新下载与绘制
+    - 独立目录 + 按条目数 LRU 淘汰，不受 temp_images 24 小时清理影响
+    """
+
+    def __init__(self, data_dir: str, max_entries: int = 300):
+        self.root = os.path.join(data_dir, "render_cache")
+        self.max_entries = max_entries
+
+        # { 键: 文件路径 }，末尾为最近使用
+        self._index: "OrderedDict[str, str]" = OrderedDict()
+        self._loaded = False
+
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+
+    @staticmethod
+    def make_key(
+        main: List[str],
+        extra: List[str],
+        side: List[str],
+        title: str,
+        layout_version: int,
+        font: Optional[Sequence] = None,
+    ) -> str:
+        """
+        规范化哈希：卡密统一为去空白的字符串，保留卡组内顺序 (顺序影响绘图结果)
+        font 为字体规格 (路径, 修改时间)，未找到字体 (使用默认字体) 时为 None
+        """
+        payload = json.dumps(
+            [
+                layout_version,
+                list(font) if font else None,
+                title,
+                [str(c).strip() for c in main],
+                [str(c).strip() for c in extra],
+                [str(c).strip() for c in side],
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, f"deck_{key}.jpg")
+
+    def _ensure_index(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.startswith("deck_") and entry.name.endswith(".jpg"):
+                entries.append((entry.stat().st_mtime, entry.name[5:-4], entry.path))
+        for _, key, path in sorted(entries):
+            self._index[key] = path
+
+    def get(self, key: str) -> Optional[str]:
+        """命中返回图片路径，否则返回 None"""
+        self._ensure_index()
+        path = self._index.get(key)
+        if path and os.path.exists(path):
+            self._index.move_to_end(key)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+
+        self._index.pop(key, None)
+        self.misses += 1
+        return None
+
+    def add(self, key: str, path: str):
+        """登记新渲染的图片，并淘汰超出上限的旧图"""
+        self._ensure_index()
+        self._index[key] = path
+        self._index.move_to_end(key)
+
+        while len(self._index) > self.max_entries:
+            _, old_path = self._index.popitem(last=False)
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                logger.debug(f"RenderCache: 删除旧图失败 {old_path}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._index),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
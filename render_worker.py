@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+卡组图 / 手牌图的纯绘图逻辑
+本模块只依赖 Pillow，不引用 AstrBot，可在子进程中直接执行
+"""
+import os
+import tempfile
+from io import BytesIO
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from .font_registry import FontSpec, load_font
+
+# 子进程内的瓦片缓存 (每个工作进程各自一份，进程常驻时可复用)
+_WORKER_TILES: "OrderedDict[str, Image.Image]" = OrderedDict()
+_WORKER_TILES_MAX = 600
+
+
+def compose_deck(
+    deck_name: str,
+    main: List[str],
+    extra: List[str],
+    side: List[str],
+    tiles: Dict[str, Image.Image],
+    font,
+    tile_size: Tuple[int, int],
+) -> Image.Image:
+    """绘制完整构筑图 (主卡组 / 额外 / 副卡组)"""
+    (card_w, card_h), gap, cols = tile_size, 4, 10
+    # 计算高度
+    main_rows = (len(main) + cols - 1) // cols if main else 0
+    extra_rows = (len(extra) + cols - 1) // cols if extra else 0
+    side_rows = (len(side) + cols - 1) // cols if side else 0
+
+    header_h, section_gap = 40, 20
+
+    total_h = header_h + (main_rows * (card_h + gap))
+    if extra: total_h += section_gap + (extra_rows * (card_h + gap))
+    if side: total_h += section_gap + (side_rows * (card_h + gap))
+    total_h += 20 # Padding
+
+    total_w = max((card_w + gap) * cols + gap, 600)
+
+    canvas = Image.new("RGB", (total_w, total_h), (25, 25, 30))
+    draw = ImageDraw.Draw(canvas)
+
+    # 绘制标题
+    draw.text((10, 8), f"Deck: {deck_name}", font=font, fill=(255, 255, 255))
+    draw.text((total_w - 200, 12), f"M:{len(main)} E:{len(extra)} S:{len(side)}", font=font, fill=(200, 200, 200))
+
+    current_y = header_h
+
+    def draw_section(ids_list, start_y):
+        for i, cid in enumerate(ids_list):
+            if cid in tiles:
+                row, col = i // cols, i % cols
+                x = gap + col * (card_w + gap)
+                y = start_y + row * (card_h + gap)
+                canvas.paste(tiles[cid], (x, y))
+        rows = (len(ids_list) + cols - 1) // cols if ids_list else 0
+        return start_y + rows * (card_h + gap)
+
+    # Main
+    if main:
+        current_y = draw_section(main, current_y)
+
+    # Extra
+    if extra:
+        current_y += section_gap
+        draw.line([(gap, current_y - section_gap/2), (total_w-gap, current_y - section_gap/2)], fill=(60,60,60), width=2)
+        current_y = draw_section(extra, current_y)
+
+    # Side
+    if side:
+        current_y += section_gap
+        draw.line([(gap, current_y - section_gap/2), (total_w-gap, current_y - section_gap/2)], fill=(60,60,60), width=2)
+        draw.text((gap, current_y - section_gap + 2), "!Side Deck", font=font, fill=(200, 200, 200))
+        current_y = draw_section(side, current_y)
+
+    return canvas
+
+
+def compose_cards(
+    card_ids: List[str],
+    title: str,
+    tiles: Dict[str, Image.Image],
+    font,
+    tile_size: Tuple[int, int],
+) -> Image.Image:
+    """绘制一组卡片 (起手 / 抽卡 / 检索展示)"""
+    (card_w, card_h), gap = tile_size, 6
+    # 动态计算画布宽度：最多一行 10 张，或者根据卡片数量自适应
+    cols = min(len(card_ids), 10)
+    rows = (len(card_ids) + cols - 1) // cols
+
+    total_w = (card_w + gap) * cols + gap
+    total_h = (card_h + gap) * rows + gap + 30 # +30 for title
+
+    # 黑色背景
+    canvas = Image.new("RGB", (total_w, total_h), (20, 20, 20))
+    draw = ImageDraw.Draw(canvas)
+
+    # 绘制标题
+    draw.text((gap, 5), title, font=font, fill=(255, 255, 255))
+
+    start_y = 30
+    for i, cid in enumerate(card_ids):
+        if cid in tiles:
+            r = i // cols
+            c = i % cols
+            x = gap + c * (card_w + gap)
+            y = start_y + gap + r * (card_h + gap)
+            canvas.paste(tiles[cid], (x, y))
+    return canvas
+
+
+def save_jpeg(canvas: Image.Image, output_path: str) -> str:
+    """
+    先写临时文件再原子替换，避免并发请求读到半张图
+    临时文件名唯一 (同一张图可能被线程与多个进程同时绘制)，失败时删除
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(output_path), prefix=f"{os.path.basename(output_path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            canvas.save(f, format="JPEG", quality=90)
+        # mkstemp 只给属主读写权限，发送图片的协议端可能以其他用户读取
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return output_path
+
+
+def encode_jpeg(canvas: Image.Image) -> bytes:
+    """编码为内存中的 JPEG 字节 (一次性图片直接发送，不落盘)"""
+    buf = BytesIO()
+    canvas.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+# ================= 子进程入口 =================
+# 参数只包含字符串 / 列表 / 字典，卡图以缓存文件路径传递，避免序列化 PIL 对象
+
+def _worker_tiles(tile_paths: Dict[str, str], tile_size: Tuple[int, int]) -> Dict[str, Image.Image]:
+    tiles = {}
+    for cid, path in tile_paths.items():
+        tile = _WORKER_TILES.get(cid)
+        if tile is None:
+            try:
+                tile = Image.open(path).convert("RGB")
+            except Exception:
+                continue
+            if tile.size != tile_size:
+                tile = tile.resize(tile_size, Image.LANCZOS)
+            _WORKER_TILES[cid] = tile
+            while len(_WORKER_TILES) > _WORKER_TILES_MAX:
+                _WORKER_TILES.popitem(last=False)
+        else:
+            _WORKER_TILES.move_to_end(cid)
+        tiles[cid] = tile
+    return tiles
+
+
+def render_deck_job(
+    deck_name: str,
+    main: List[str],
+    extra: List[str],
+    side: List[str],
+    tile_paths: Dict[str, str],
+    font_spec: Optional[FontSpec],
+    tile_size: Tuple[int, int],
+    output_path: str,
+) -> str:
+    tiles = _worker_tiles(tile_paths, tile_size)
+    canvas = compose_deck(deck_name, main, extra, side, tiles, load_font(font_spec, 24), tile_size)
+    return save_jpeg(canvas, output_path)
+
+
+def render_cards_job(
+    card_ids: List[str],
+    title: str,
+    tile_paths: Dict[str, str],
+    font_spec: Optional[FontSpec],
+    tile_size: Tuple[int, int],
+) -> bytes:
+    tiles = _worker_tiles(tile_paths, tile_size)
+    canvas = compose_cards(card_ids, title, tiles, load_font(font_spec, 24), tile_size)
+    return encode_jpeg(canvas)
@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import aiohttp
 import re
 import html
 import time
@@ -10,8 +9,9 @@ from astrbot.api.all import logger
 
 
 class RotKManager:
-    def __init__(self, data_dir: str):  # 1. 参数名改为 data_dir
+    def __init__(self, data_dir: str, http):  # 1. 参数名改为 data_dir
         self.data_dir = data_dir  # 2. 属性名改为 self.data_dir
+        self.http = http  # 插件共享的 HttpClient
         # 3. 下面使用 self.data_dir
         self.data_file = os.path.join(self.data_dir, "ocg_report_data.json")
         self.img_dir = os.path.join(self.data_dir, "ocg_images")
@@ -53,7 +53,7 @@ class RotKManager:
 
     async def _fetch_html(self, session, url):
         try:
-            async with session.get(url, timeout=20, ssl=False) as resp:
+            async with session.get(url, headers=self.headers, timeout=20, ssl=False) as resp:
                 if resp.status == 200:
                     return await resp.text()
         except Exception as e:
@@ -68,7 +68,7 @@ class RotKManager:
             filename = f"ocg_img_{index}.{ext}"
             save_path = os.path.join(self.img_dir, filename)
 
-            async with session.get(url, timeout=15, ssl=False) as resp:
+            async with session.get(url, headers=self.headers, timeout=15, ssl=False) as resp:
                 if resp.status == 200:
                     data = await resp.read()
                     with open(save_path, "wb") as f:
@@ -81,13 +81,12 @@ class RotKManager:
     async def _download_images(self, url_list):
         logger.info("[RotK] Clearing cache and downloading images...")
         self._clear_image_cache()
-        local_paths = []
-        async with aiohttp.ClientSession(trust_env=True, headers=self.headers) as session:
-            tasks = []
-            for i, url in enumerate(url_list):
-                tasks.append(self._download_single_image(session, url, i))
-            results = await asyncio.gather(*tasks)
-            local_paths = [p for p in results if p]
+        session = self.http.session
+        tasks = []
+        for i, url in enumerate(url_list):
+            tasks.append(self._download_single_image(session, url, i))
+        results = await asyncio.gather(*tasks)
+        local_paths = [p for p in results if p]
         return local_paths
 
     async def _fetch_article_content_images(self, session, article_url):
@@ -162,61 +161,61 @@ class RotKManager:
 
     async def fetch_latest_report(self):
         logger.info(f"[RotK] Starting fetch from {self.base_url}")
-        async with aiohttp.ClientSession(trust_env=True, headers=self.headers) as session:
-            content = await self._fetch_html(session, self.base_url)
-            if not content:
-                return {"error": "Main page fetch failed"}
-
-            articles = content.split("<article")
-            for raw_article in articles[1:]:
-                title_match = re.search(
-                    r"entry-title.*?<a[^>]+>([^<]+)</a>", raw_article, re.DOTALL
-                )
-                if not title_match:
-                    continue
-
-                raw_title = title_match.group(1).strip()
-                title = html.unescape(raw_title)
-
-                if "metagame report" not in title.lower():
-                    continue
-
-                link_match = re.search(r'href="([^"]+)"', title_match.group(0))
-                url = link_match.group(1) if link_match else ""
-
-                date_match = re.search(r"<time[^>]+>([^<]+)</time>", raw_article)
-                date = date_match.group(1) if date_match else "Unknown"
-
-                # 封面图 (Cover)
-                cover_img = None
-                cover_match = re.search(r'<img[^>]+src="([^"]+)"', raw_article)
-                if cover_match:
-                    raw_cover = html.unescape(cover_match.group(1))
-                    # 尝试还原封面高清图 (去掉 -520x245 等后缀)
-                    cover_img = re.sub(r"-\d+x\d+\.(jpg|png|webp)$", r".\1", raw_cover)
-
-                logger.info(f"[RotK] Target: {title}")
-
-                # 深层抓取 (Pie Chart + Decks)
-                image_urls = []
-                if cover_img:
-                    image_urls.append(cover_img)
-
-                if url:
-                    body_imgs = await self._fetch_article_content_images(session, url)
-                    for img in body_imgs:
-                        if img not in image_urls:
-                            image_urls.append(img)
-
-                # 下载
-                local_paths = await self._download_images(image_urls)
-
-                return {
-                    "title": title,
-                    "url": url,
-                    "local_paths": local_paths,
-                    "date": date,
-                    "update_time": time.strftime("%Y-%m-%d %H:%M:%S"),
-                }
+        session = self.http.session
+        content = await self._fetch_html(session, self.base_url)
+        if not content:
+            return {"error": "Main page fetch failed"}
+
+        articles = content.split("<article")
+        for raw_article in articles[1:]:
+            title_match = re.search(
+                r"entry-title.*?<a[^>]+>([^<]+)</a>", raw_article, re.DOTALL
+            )
+            if not title_match:
+                continue
+
+            raw_title = title_match.group(1).strip()
+            title = html.unescape(raw_title)
+
+            if "metagame report" not in title.lower():
+                continue
+
+            link_match = re.search(r'href="([^"]+)"', title_match.group(0))
+            url = link_match.group(1) if link_match else ""
+
+            date_match = re.search(r"<time[^>]+>([^<]+)</time>", raw_article)
+            date = date_match.group(1) if date_match else "Unknown"
+
+            # 封面图 (Cover)
+            cover_img = None
+            cover_match = re.search(r'<img[^>]+src="([^"]+)"', raw_article)
+            if cover_match:
+                raw_cover = html.unescape(cover_match.group(1))
+                # 尝试还原封面高清图 (去掉 -520x245 等后缀)
+                cover_img = re.sub(r"-\d+x\d+\.(jpg|png|webp)$", r".\1", raw_cover)
+
+            logger.info(f"[RotK] Target: {title}")
+
+            # 深层抓取 (Pie Chart + Decks)
+            image_urls = []
+            if cover_img:
+                image_urls.append(cover_img)
+
+            if url:
+                body_imgs = await self._fetch_article_content_images(session, url)
+                for img in body_imgs:
+                    if img not in image_urls:
+                        image_urls.append(img)
+
+            # 下载
+            local_paths = await self._download_images(image_urls)
+
+            return {
+                "title": title,
+                "url": url,
+                "local_paths": local_paths,
+                "date": date,
+                "update_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
 
         return {"error": "No report found"}
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ttl_cache import TTLCache
+
+# 精简后的搜索结果: 只保留列表展示与选卡需要的字段
+SearchResults = Tuple[Dict[str, Any], ...]
+
+
+class SearchCursor:
+    """
+    用户的查卡翻页状态
+    记录查询词与展示给用户的结果卡密 (按序号顺序)，卡名等数据在 SearchResultCache 中由所有用户共享
+    /查卡序号 按保存的卡密选卡，共享缓存过期后重新搜索的结果即使顺序变化也不会选错卡
+    """
+
+    __slots__ = ("query", "card_ids")
+
+    def __init__(self, query: str, results: SearchResults):
+        self.query = query
+        self.card_ids: Tuple[Any, ...] = tuple(card.get("id") for card in results)
+
+
+class SearchResultCache:
+    """
+    查卡结果缓存 (所有用户共享)
+    - 查询词归一化 (全角转半角 + 忽略大小写 + 合并空白)，"青眼 白龙" 与 "青眼　白龙" 命中同一条
+    - 结果精简为 id / cn_name / type，不保存完整卡片数据
+    - TTL + LRU 上限，卡库导入 / 索引重建后整体清空
+    """
+
+    FIELDS = ("id", "cn_name", "type")
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        text = unicodedata.normalize("NFKC", query or "").casefold()
+        return " ".join(text.split())
+
+    @classmethod
+    def compact(cls, results: List[Dict[str, Any]]) -> SearchResults:
+        return tuple(
+            {field: card.get(field) for field in cls.FIELDS if field in card}
+            for card in results
+            if isinstance(card, dict)
+        )
+
+    def get(self, query: str) -> Optional[SearchResults]:
+        return self.entries.get(self.normalize(query))
+
+    def put(self, query: str, results: List[Dict[str, Any]]) -> SearchResults:
+        compacted = self.compact(results)
+        self.entries.set(self.normalize(query), compacted)
+        return compacted
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self.entries.stats()
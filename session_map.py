@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """粗略估算对象内存占用 (对象本身 + 一层字段 / 元素，不深入递归)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(v) for v in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(sys.getsizeof(getattr(value, name, None)) for name in value.__slots__)
+    return size
+
+
+class SessionMap:
+    """
+    按用户保存的会话状态 (TTL + LRU)
+    - 闲置超过 ttl 秒的会话在访问或写入时顺带清理 (每次访问会刷新闲置计时)
+    - 超过 maxsize 个会话时淘汰最久未访问的
+    - stats() 给出条目数、命中、过期 / 淘汰次数与估算内存
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        ttl: Optional[float] = 1800,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sizeof = sizeof
+        # { key: (最后访问时间, value) }，末尾为最近访问
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _prune(self, now: float):
+        if self.ttl:
+            deadline = now - self.ttl
+            while self._data:
+                key, (last_access, _) = next(iter(self._data.items()))
+                if last_access >= deadline:
+                    break
+                del self._data[key]
+                self.expired += 1
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        self._prune(now)
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        self._data[key] = (now, item[1])
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any):
+        now = time.monotonic()
+        self._data[key] = (now, value)
+        self._data.move_to_end(key)
+        self._prune(now)
+
+    __setitem__ = set
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def approx_bytes(self) -> int:
+        return sys.getsizeof(self._data) + sum(
+            sys.getsizeof(key) + self.sizeof(value) for key, (_, value) in self._data.items()
+        )
+
+    def stats(self) -> Dict[str, int]:
+        self._prune(time.monotonic())
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "bytes": self.approx_bytes(),
+        }
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import os
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from astrbot.api.all import logger
+
+
+class ThumbnailCache:
+    """
+    卡图缩略图磁盘缓存 (按卡密存储)
+    - 目录分片: thumb_cache/<md5前两位>/<卡密>.jpg，避免单目录文件过多
+    - 容量上限: 超出后按最近使用时间 (LRU) 淘汰
+    - 读取校验: JPEG 头尾标记不完整的文件视为损坏并删除
+    - 磁盘操作 (启动时的目录扫描、读写与访问时间更新) 都在线程池中执行，索引只在事件循环中修改
+    """
+
+    def __init__(self, data_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.root = os.path.join(data_dir, "thumb_cache")
+        self.max_bytes = max_bytes
+
+        # { 卡密: 文件大小 }，顺序即 LRU 顺序 (末尾为最近使用)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._load_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+
+    def path_for(self, card_id: str) -> str:
+        card_id = str(card_id)
+        shard = hashlib.md5(card_id.encode()).hexdigest()[:2]
+        return os.path.join(self.root, shard, f"{card_id}.jpg")
+
+    @staticmethod
+    def _is_valid_jpeg(data: bytes) -> bool:
+        # SOI 开头，EOI 结尾 (允许少量尾部填充)
+        return len(data) > 4 and data[:2] == b"\xff\xd8" and b"\xff\xd9" in data[-16:]
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """[线程池] 扫描磁盘，返回按修改时间排序的 (修改时间, 卡密, 大小)"""
+        entries = []
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for entry in os.scandir(shard_dir):
+                try:
+                    if entry.is_file() and entry.name.endswith(".jpg"):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+                except OSError:
+                    continue
+        entries.sort()
+        return entries
+
+    async def _load_index(self):
+        try:
+            entries = await asyncio.get_running_loop().run_in_executor(None, self._scan)
+        except OSError as e:
+            logger.warning(f"ThumbnailCache: 扫描缓存目录失败: {e}")
+            entries = []
+        # 扫描期间已写入的条目更新，排在恢复的旧条目之后
+        fresh = self._index
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        for _, card_id, size in entries:
+            if card_id not in fresh:
+                self._index[card_id] = size
+                self._total_bytes += size
+        for card_id, size in fresh.items():
+            self._index[card_id] = size
+            self._total_bytes += size
+        self._loaded = True
+        if entries:
+            logger.info(f"ThumbnailCache: 已索引 {len(entries)} 张缓存卡图")
+
+    def start_loading(self):
+        """在后台线程中扫描磁盘，按修改时间恢复 LRU 顺序 (没有运行中的事件循环时忽略)"""
+        if self._loaded or self._load_task:
+            return
+        try:
+            self._load_task = asyncio.get_running_loop().create_task(self._load_index())
+        except RuntimeError:
+            self._load_task = None
+
+    async def wait_loaded(self):
+        """等待索引加载完成 (未启动时立即启动)"""
+        if self._loaded:
+            return
+        self.start_loading()
+        if self._load_task:
+            await asyncio.shield(self._load_task)
+
+    def has(self, card_id: str) -> bool:
+        """是否已缓存 (不读取文件，不计入命中统计；索引加载完成前只反映本次运行写入的卡图)"""
+        return str(card_id) in self._index
+
+    def _read(self, path: str) -> bytes:
+        """[线程池] 读取文件并刷新修改时间 (重启后 LRU 顺序依然有效)"""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return b""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    async def get(self, card_id: str) -> Optional[bytes]:
+        """读取缓存的卡图字节，未命中或损坏返回 None"""
+        card_id = str(card_id)
+        await self.wait_loaded()
+        size = self._index.get(card_id)
+        if size is None:
+            self.misses += 1
+            return None
+
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self._read, self.path_for(card_id))
+
+        if len(data) != size or not self._is_valid_jpeg(data):
+            logger.warning(f"ThumbnailCache: 缓存卡图损坏，已丢弃 {card_id}")
+            if self._index.get(card_id) == size:
+                await self._remove([card_id])
+            self.misses += 1
+            return None
+
+        if card_id in self._index:
+            self._index.move_to_end(card_id)
+        self.hits += 1
+        return data
+
+    def _write(self, path: str, data: bytes):
+        """[线程池] 先写临时文件再原子替换"""
+        tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def put(self, card_id: str, data: bytes):
+        """写入卡图，并按容量淘汰"""
+        card_id = str(card_id)
+        if not self._is_valid_jpeg(data):
+            return
+        await self.wait_loaded()
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, self.path_for(card_id), data)
+        except OSError as e:
+            logger.warning(f"ThumbnailCache: 写入失败 {card_id}: {e}")
+            return
+
+        self._total_bytes += len(data) - self._index.pop(card_id, 0)
+        self._index[card_id] = len(data)
+
+        evicted = []
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._total_bytes -= self._index.pop(oldest)
+            evicted.append(oldest)
+        if evicted:
+            await loop.run_in_executor(None, self._delete_files, evicted)
+
+    def _delete_files(self, card_ids: List[str]):
+        """[线程池] 删除缓存文件"""
+        for card_id in card_ids:
+            try:
+                os.remove(self.path_for(card_id))
+            except OSError:
+                pass
+
+    async def _remove(self, card_ids: List[str]):
+        for card_id in card_ids:
+            self._total_bytes -= self._index.pop(card_id, 0)
+        await asyncio.get_running_loop().run_in_executor(None, self._delete_files, card_ids)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
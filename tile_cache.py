@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+class TileCache:
+    """
+    已解码卡图瓦片的内存缓存 (线程安全)
+    瓦片已缩放到绘图布局使用的尺寸，拼图时直接 paste，无需重复 JPEG 解码
+    按像素内存占用淘汰最久未使用的瓦片
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._tiles: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _tile_bytes(tile: "Image.Image") -> int:
+        w, h = tile.size
+        return w * h * len(tile.getbands())
+
+    def get(self, card_id: str) -> Optional["Image.Image"]:
+        with self._lock:
+            tile = self._tiles.get(card_id)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(card_id)
+            self.hits += 1
+            return tile
+
+    def put(self, card_id: str, tile: "Image.Image"):
+        with self._lock:
+            old = self._tiles.pop(card_id, None)
+            if old is not None:
+                self._bytes -= self._tile_bytes(old)
+            self._tiles[card_id] = tile
+            self._bytes += self._tile_bytes(tile)
+
+            while self._bytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self._bytes -= self._tile_bytes(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._tiles),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,66 +1,74 @@
 # -*- coding: utf-8 -*-
 import os
-import aiohttp
 import asyncio
 import time
 from io import BytesIO
 from typing import List, Tuple, Optional, Dict
 from astrbot.api.all import logger
+from .thumbnail_cache import ThumbnailCache
+from .card_image_fetcher import CardImageFetcher
+from .tile_cache import TileCache
+from .render_cache import RenderCache
+from .render_backend import RenderPool
+from .deck import Deck
+from .deck_store import DeckStore
 import urllib.parse
-import base64
-import struct
-import random
 
 try:
     from PIL import Image, ImageDraw, ImageFont
+    from . import render_worker
+    from .font_registry import FontRegistry
     HAS_PILLOW = True
 except ImportError:
     HAS_PILLOW = False
     logger.warning("YDKManager: Pillow not installed.")
 
 class YDKManager:
-    def __init__(self, data_dir: str, plugin_dir: str):
+    # 绘图布局中单张卡图的尺寸 (宽, 高)
+    TILE_SIZE = (82, 120)
+    # 构筑图布局版本，修改 _sync_draw_logic 的绘制效果时递增，使旧渲染缓存失效
+    RENDER_LAYOUT_VERSION = 1
+
+    def __init__(self, data_dir: str, plugin_dir: str, http, render_workers: int = 0, cdn_concurrency: int = 6):
         self.data_dir = data_dir
         self.plugin_dir = plugin_dir
+        self.http = http  # 插件共享的 HttpClient
         self.images_dir = os.path.join(data_dir, "temp_images")
-        self.cache_dir = os.path.join(data_dir, "deck_cache") # 新增：专门存放ydk的文件夹
+        self.cache_dir = os.path.join(data_dir, "deck_cache") # 旧版 ydk 文件目录，仅用于迁移
 
         if not os.path.exists(self.images_dir):
             os.makedirs(self.images_dir)
-        if not os.path.exists(self.cache_dir): # 确保缓存目录存在
-            os.makedirs(self.cache_dir)
+
+        # 会话卡组存储 (SQLite)，首次启动时导入旧版 deck_cache/*.ydk
+        self.deck_store = DeckStore(data_dir)
+        self.deck_store.migrate_ydk_dir(self.cache_dir)
+
+        # 卡图缩略图持久缓存，已见过的卡片绘图时不再联网
+        self.thumb_cache = ThumbnailCache(data_dir)
+        # 卡图下载 (请求合并 + 每主机并发限制 + 退避重试)
+        self.image_fetcher = CardImageFetcher(http, self.thumb_cache, per_host_limit=cdn_concurrency)
+        # 已解码并缩放好的卡图瓦片，拼图时免去 JPEG 解码
+        self.tile_cache = TileCache()
+        # 构筑图渲染缓存，卡组未变化时直接复用
+        self.render_cache = RenderCache(data_dir)
+        # 可选的多进程绘图后端 (0 = 仅使用线程池)
+        self.render_pool = RenderPool(render_workers)
+        # 字体只查找 / 解析一次，所有绘图共享
+        self.fonts = FontRegistry(plugin_dir) if HAS_PILLOW else None
+
+    async def close(self):
+        """插件卸载时释放绘图进程池与卡组存储"""
+        await self.render_pool.aclose()
+        self.deck_store.close()
             
-    def parse_ydk(self, text: str) -> Tuple[List[str], List[str], List[str]]:
-        """解析 YDK 文本内容为 ID 列表"""
-        main, extra, side = [], [], []
-        mode = "none"
-        
-        for line in text.splitlines():
-            line = line.strip()
-            if not line: continue
-            if line.startswith("#main"):
-                mode = "main"
-                continue
-            elif line.startswith("#extra"):
-                mode = "extra"
-                continue
-            elif line.startswith("!side"):
-                mode = "side"
-                continue
-            elif line.startswith("#"):
-                continue
-                
-            if line.isdigit():
-                if mode == "main": main.append(line)
-                elif mode == "extra": extra.append(line)
-                elif mode == "side": side.append(line)
-                
-        return main, extra, side
+    def parse_ydk(self, text: str) -> Deck:
+        """解析 YDK 文本内容为卡组"""
+        return Deck.from_ydk(text)
     
-    def parse_ourocg_url(self, url: str) -> Tuple[List[str], List[str], List[str]]:
+    def parse_ourocg_url(self, url: str) -> Deck:
         """
         解析 Ourocg 卡组分享链接
-        返回: (main_list, extra_list, side_list)
+        核心解码见 deck_codec.decode_ourocg (Ourocg V1: ID = Low 27 bits, Count = High 2 bits)
         """
         try:
             # 1. 解析 URL 参数
@@ -71,419 +79,253 @@ class YDKManager:
             d_param = params.get('d', [''])[0]
             if not d_param:
                 logger.error("URL missing 'd' parameter")
-                return [], [], []
+                return Deck()
 
-            # 2. 调用核心解码逻辑
-            deck_data = self._decode_ourocg_data(d_param)
-            
-            return deck_data["main"], deck_data["extra"], deck_data["side"]
+            deck = Deck.from_ourocg(d_param)
+            logger.info(f"Ourocg Decode: {deck.summary()}")
+            return deck
 
         except Exception as e:
             logger.error(f"Ourocg Parse Error: {e}")
-            return [], [], []
-    
-    def _decode_ourocg_data(self, encoded_str: str) -> Dict[str, List[str]]:
-        """
-        核心解码逻辑 (Ourocg V1 算法)
-        基于 JS 源码逆向：Base64 -> Binary String -> 29-bit chunks
-        修正：ID = Low 27 bits, Count = High 2 bits
-        """
-        main_ids, extra_ids, side_ids = [], [], []
-        
-        try:
-            # 1. URL Safe Base64 还原
-            safe_str = encoded_str.replace('-', '+').replace('_', '/')
-            
-            # 补全 Padding (=)
-            padding = len(safe_str) % 4
-            if padding:
-                safe_str += '=' * (4 - padding)
-            
-            # 2. Base64 解码为字节
-            byte_data = base64.b64decode(safe_str)
-            
-            # 3. 转为二进制字符串 (每个字节转8位01)
-            bin_str = "".join([format(b, '08b') for b in byte_data])
-            
-            # 4. 解析头部
-            # Main(8 bit) + Extra(4 bit) + Side(4 bit) = 16 bits
-            if len(bin_str) < 16:
-                return {"main": [], "extra": [], "side": []}
-                
-            main_count = int(bin_str[0:8], 2)
-            extra_count = int(bin_str[8:12], 2)
-            side_count = int(bin_str[12:16], 2)
-            
-            offset = 16
-            
-            # 辅助解析函数
-            def parse_section(count):
-                nonlocal offset
-                ids = []
-                for _ in range(count):
-                    if offset + 29 > len(bin_str): break
-                    
-                    # 截取 29 位
-                    chunk = bin_str[offset : offset + 29]
-                    offset += 29
-                    
-                    val = int(chunk, 2)
-                    
-                    # [关键修正]
-                    # Ourocg V1: 前2位是数量，后27位是ID
-                    card_count = val >> 27
-                    card_id = str(val & 0x7FFFFFF)
-                    
-                    # 添加 card_count 次 ID
-                    for _ in range(card_count):
-                        ids.append(card_id)
-                return ids
-
-            # 5. 依次解析三个区域
-            main_ids = parse_section(main_count)
-            extra_ids = parse_section(extra_count)
-            side_ids = parse_section(side_count)
-            
-            logger.info(f"Ourocg Decode: M:{len(main_ids)} E:{len(extra_ids)} S:{len(side_ids)}")
-            
-        except Exception as e:
-            logger.error(f"Ourocg Decode Failed: {e}")
-            
-        return {"main": main_ids, "extra": extra_ids, "side": side_ids}
-            
-    
-    def parse_ydke_url(self, url: str) -> Tuple[List[str], List[str], List[str]]:
+            return Deck()
+
+    def parse_ydke_url(self, url: str) -> Deck:
         """
         解析 YDKe 链接 (ydke://...)
         格式: ydke://Base64(Main)!Base64(Extra)!Base64(Side)!
         """
         try:
-            # 去掉前缀
-            clean_url = url.replace("ydke://", "").strip()
-            
-            # 按 ! 分割
-            parts = clean_url.split('!')
-            
-            # YDKe 标准通常有3个部分，最后可能有个空字符串
-            # Main ! Extra ! Side !
-            main_str = parts[0] if len(parts) > 0 else ""
-            extra_str = parts[1] if len(parts) > 1 else ""
-            side_str = parts[2] if len(parts) > 2 else ""
-            
-            main_ids = self._decode_ydke_ids(main_str)
-            extra_ids = self._decode_ydke_ids(extra_str)
-            side_ids = self._decode_ydke_ids(side_str)
-            
-            logger.info(f"YDKe Decode: M:{len(main_ids)} E:{len(extra_ids)} S:{len(side_ids)}")
-            return main_ids, extra_ids, side_ids
-            
+            deck = Deck.from_ydke(url)
+            logger.info(f"YDKe Decode: {deck.summary()}")
+            return deck
         except Exception as e:
             logger.error(f"YDKe Parse Error: {e}")
-            return [], [], []
+            return Deck()
 
-    def _decode_ydke_ids(self, b64_str: str) -> List[str]:
-        """
-        YDKe 核心解码: Base64 -> Bytes -> Int32 (Little Endian)
-        """
-        if not b64_str: return []
-        ids = []
+    def build_ourocg_url(self, deck: Deck) -> Optional[str]:
+        """生成 Ourocg 卡组分享链接，无法编码时返回 None"""
         try:
-            # 1. 补全 Base64 Padding
-            padding = len(b64_str) % 4
-            if padding:
-                b64_str += '=' * (4 - padding)
-            
-            # 2. 解码为字节
-            byte_data = base64.b64decode(b64_str)
-            
-            # 3. 每4个字节转为一个整数 (ID)
-            count = len(byte_data) // 4
-            # '<' 表示小端序，'I' 表示无符号整数 (4 bytes)
-            # unpack 返回的是元组，所以需要解包或者用 iter_unpack
-            for i in range(count):
-                chunk = byte_data[i*4 : (i+1)*4]
-                card_id = struct.unpack('<I', chunk)[0]
-                ids.append(str(card_id))
-                
+            return deck.to_ourocg_url()
         except Exception as e:
-            logger.error(f"YDKe Chunk Decode Error: {e}")
-            
-        return ids
+            logger.warning(f"Ourocg Encode Failed: {e}")
+            return None
+
+    def build_ydke_url(self, deck: Deck) -> Optional[str]:
+        """生成 ydke:// 链接，无法编码时返回 None"""
+        try:
+            return deck.to_ydke()
+        except Exception as e:
+            logger.warning(f"YDKe Encode Failed: {e}")
+            return None
     
-    def save_ydk(self, main: List[str], extra: List[str], side: List[str], session_id: str) -> str:
-        """保存 YDK (区分会话)"""
-        self._cleanup_old_files() # 顺手清理过期文件
-        
-        content = ["#created by DuelGalatea", "#main"]
-        content.extend(main)
-        content.append("#extra")
-        content.extend(extra)
-        content.append("!side")
-        content.extend(side)
-        content.append("")
-        
-        # 文件名带上 session_id
-        file_path = os.path.join(self.cache_dir, f"deck_{session_id}.ydk")
-        
+    def save_ydk(self, deck: Deck, session_id: str) -> bool:
+        """保存会话卡组 (过期数据由后台 CacheJanitor 清理)"""
+        return self.deck_store.put(session_id, deck)
+
+    def load_last_ydk(self, session_id: str) -> Deck:
+        """读取指定会话的卡组，没有时返回空卡组"""
+        return self.deck_store.get(session_id) or Deck()
+
+    def has_deck(self, session_id: str) -> bool:
+        return self.deck_store.has(session_id)
+
+    def export_ydk_file(self, session_id: str) -> Optional[str]:
+        """按需导出 .ydk 文件 (用于发送文件)，没有卡组时返回 None"""
+        deck = self.deck_store.get(session_id)
+        if not deck:
+            return None
+        file_path = os.path.join(self.images_dir, f"deck_{session_id}.ydk")
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
-                f.write("\n".join(content))
+                f.write(deck.to_ydk())
             return file_path
         except Exception as e:
-            logger.error(f"YDK Save Error: {e}")
-            return ""
+            logger.error(f"YDK Export Error: {e}")
+            return None
 
-    def load_last_ydk(self, session_id: str) -> Tuple[List[str], List[str], List[str]]:
-        """读取指定会话的 YDK"""
-        file_path = os.path.join(self.cache_dir, f"deck_{session_id}.ydk")
-        
-        if not os.path.exists(file_path):
-            return [], [], []
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return self.parse_ydk(f.read())
-        except Exception as e:
-            logger.error(f"YDK Load Error: {e}")
-            return [], [], []
+    async def _fetch_image_bytes(self, card_id: str) -> Optional[bytes]:
+        """按 ID 获取缩略图原始字节 (本地缓存 -> CDN，同卡并发请求合并)"""
+        return await self.image_fetcher.fetch(card_id)
 
-    async def _download_image(self, session: aiohttp.ClientSession, card_id: str) -> Optional[Image.Image]:
-        """按 ID 下载图片"""
-        url = f"https://cdn.233.momobako.com/ygopro/pics/{card_id}.jpg!thumb2"
-        try:
-            async with session.get(url, timeout=10, ssl=False) as resp:
-                if resp.status == 200:
-                    data = await resp.read()
-                    return Image.open(BytesIO(data))
-        except: pass
-        return None
+    async def fetch_card_image(self, card_id: str) -> Optional[bytes]:
+        """获取卡图原始 JPEG 字节 (CDN 原样数据，可直接发送，无需解码再编码)"""
+        return await self._fetch_image_bytes(str(card_id))
+
+    async def _load_tiles(self, card_ids: List[str]) -> Dict[str, "Image.Image"]:
+        """获取一组卡片的绘图瓦片 (内存缓存 -> 磁盘/网络 + 线程池解码)"""
+        tiles = {}
+        missing = []
+        for cid in card_ids:
+            tile = self.tile_cache.get(cid)
+            if tile is not None:
+                tiles[cid] = tile
+            else:
+                missing.append(cid)
+
+        if missing:
+            results = await asyncio.gather(*[self._fetch_image_bytes(cid) for cid in missing])
+            raw = {cid: data for cid, data in zip(missing, results) if data}
+            if raw:
+                # JPEG 解码与缩放属于 CPU 密集型，放入线程池
+                loop = asyncio.get_running_loop()
+                tiles.update(await loop.run_in_executor(None, self._decode_tiles, raw))
+        return tiles
+
+    def _decode_tiles(self, raw: Dict[str, bytes]) -> Dict[str, "Image.Image"]:
+        """[同步方法] 解码卡图并缩放为布局尺寸，写入瓦片缓存"""
+        tiles = {}
+        for cid, data in raw.items():
+            try:
+                tile = Image.open(BytesIO(data)).convert("RGB")
+                if tile.size != self.TILE_SIZE:
+                    tile = tile.resize(self.TILE_SIZE, Image.LANCZOS)
+                self.tile_cache.put(cid, tile)
+                tiles[cid] = tile
+            except Exception as e:
+                logger.warning(f"Tile Decode Error {cid}: {e}")
+        return tiles
 
     async def draw_deck_image(self, session_id: str, deck_name: str = "YDK Deck") -> Optional[str]:
         """根据当前缓存的 YDK 绘制图片 (异步非阻塞版)"""
         if not HAS_PILLOW: return None
         
-        main, extra, side = self.load_last_ydk(session_id)
-        if not main and not extra: return None
+        deck = self.load_last_ydk(session_id)
+        if not deck: return None
+
+        # 0. 卡组、标题与字体都没变化时，直接返回已有构筑图
+        render_key = RenderCache.make_key(
+            deck.main, deck.extra, deck.side, deck_name, self.RENDER_LAYOUT_VERSION, self.fonts.spec
+        )
+        cached_path = self.render_cache.get(render_key)
+        if cached_path:
+            return cached_path
+
+        # 卡图缓存与绘图以字符串卡密为键，只在真正需要绘图时转换
+        main, extra, side = deck.main_ids(), deck.extra_ids(), deck.side_ids()
 
         logger.info(f"🎨 Drawing YDK: Main({len(main)}) Extra({len(extra)}) Side({len(side)})")
+        unique_ids = list(set(main + extra + side))
 
-        # 1. 异步下载图片 (IO 密集型，保持在主循环)
-        images_cache = {} # 格式: { "card_id": ImageObject }
-        unique_ids = set(main + extra + side)
-        
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            tasks = []
-            id_list = list(unique_ids)
-            for cid in id_list:
-                tasks.append(self._download_image(session, cid))
-            
-            results = await asyncio.gather(*tasks)
-            for cid, img in zip(id_list, results):
-                if img: 
-                    images_cache[cid] = img
+        # 1. 多进程绘图 (已启用时)：卡图以磁盘缓存路径传给子进程
+        output_path = None
+        if self.render_pool.enabled:
+            tile_paths = await self._prepare_tile_paths(unique_ids)
+            if not tile_paths:
+                return None
+            complete = len(tile_paths) == len(unique_ids)
+            output_path = await self.render_pool.submit(
+                render_worker.render_deck_job,
+                deck_name,
+                main,
+                extra,
+                side,
+                tile_paths,
+                self.fonts.spec,
+                self.TILE_SIZE,
+                self._deck_output_path(render_key, complete),
+            )
 
-        if not images_cache:
-            return None
+        # 2. 线程绘图 (默认，或进程池不可用时回退)
+        if not output_path:
+            # 获取卡图瓦片 (缓存命中时无需下载与解码)
+            # 格式: { "card_id": ImageObject }
+            images_cache = await self._load_tiles(unique_ids)
+            if not images_cache:
+                return None
+            complete = len(images_cache) == len(unique_ids)
 
-        # 2. 将绘图逻辑放入线程池 (CPU 密集型)
-        loop = asyncio.get_running_loop()
-        
-        # run_in_executor(None, 函数, 参数1, 参数2...)
-        # None 表示使用默认的 ThreadPoolExecutor
-        output_path = await loop.run_in_executor(
-            None, 
-            self._sync_draw_logic, # 刚才那个新函数
-            deck_name, 
-            main, 
-            extra, 
-            side, 
-            images_cache
-        )
-        
+            # 将绘图逻辑放入线程池 (CPU 密集型)
+            loop = asyncio.get_running_loop()
+
+            # run_in_executor(None, 函数, 参数1, 参数2...)
+            # None 表示使用默认的 ThreadPoolExecutor
+            output_path = await loop.run_in_executor(
+                None,
+                self._sync_draw_logic,
+                deck_name,
+                main,
+                extra,
+                side,
+                images_cache,
+                self._deck_output_path(render_key, complete),
+            )
+
+        if output_path and complete:
+            self.render_cache.add(render_key, output_path)
         return output_path
-    
-    def _sync_draw_logic(self, deck_name: str, main: List[str], extra: List[str], side: List[str], images_cache: dict) -> Optional[str]:
+
+    def _deck_output_path(self, render_key: str, complete: bool) -> str:
+        """卡图齐全才写入渲染缓存，缺图的结果只作为临时文件，下次重新绘制"""
+        if complete:
+            return self.render_cache.path_for(render_key)
+        return os.path.join(self.images_dir, f"deck_{render_key[:12]}_{int(time.time())}.jpg")
+
+    async def _prepare_tile_paths(self, card_ids: List[str]) -> Dict[str, str]:
+        """[多进程绘图] 确保卡图已写入磁盘缓存，返回 { 卡密: 缓存文件路径 }"""
+        await self.thumb_cache.wait_loaded()
+        missing = [cid for cid in card_ids if not self.thumb_cache.has(cid)]
+        if missing:
+            await asyncio.gather(*[self._fetch_image_bytes(cid) for cid in missing])
+        return {
+            cid: self.thumb_cache.path_for(cid)
+            for cid in card_ids
+            if self.thumb_cache.has(cid)
+        }
+
+    def _sync_draw_logic(self, deck_name: str, main: List[str], extra: List[str], side: List[str], images_cache: dict, output_path: str) -> Optional[str]:
         """
         [同步方法] 纯 CPU 密集的绘图逻辑，供 run_in_executor 调用
         """
         try:
-            # --- 以下代码完全来自原来的 draw_deck_image 后半部分 ---
-            card_w, card_h, gap, cols = 82, 120, 4, 10
-            # 计算高度
-            main_rows = (len(main) + cols - 1) // cols if main else 0
-            extra_rows = (len(extra) + cols - 1) // cols if extra else 0
-            side_rows = (len(side) + cols - 1) // cols if side else 0
-            
-            header_h, section_gap = 40, 20
-            
-            total_h = header_h + (main_rows * (card_h + gap))
-            if extra: total_h += section_gap + (extra_rows * (card_h + gap))
-            if side: total_h += section_gap + (side_rows * (card_h + gap))
-            total_h += 20 # Padding
-            
-            total_w = max((card_w + gap) * cols + gap, 600)
-
-            canvas = Image.new("RGB", (total_w, total_h), (25, 25, 30))
-            draw = ImageDraw.Draw(canvas)
-
-            # 加载字体
-            font = self._load_font()
-            
-            # 绘制标题
-            draw.text((10, 8), f"Deck: {deck_name}", font=font, fill=(255, 255, 255))
-            draw.text((total_w - 200, 12), f"M:{len(main)} E:{len(extra)} S:{len(side)}", font=font, fill=(200, 200, 200))
-
-            current_y = header_h
-            
-            def draw_section(ids_list, start_y):
-                for i, cid in enumerate(ids_list):
-                    if cid in images_cache:
-                        row, col = i // cols, i % cols
-                        x = gap + col * (card_w + gap)
-                        y = start_y + row * (card_h + gap)
-                        canvas.paste(images_cache[cid], (x, y))
-                rows = (len(ids_list) + cols - 1) // cols if ids_list else 0
-                return start_y + rows * (card_h + gap)
-
-            # Main
-            if main:
-                current_y = draw_section(main, current_y)
-            
-            # Extra
-            if extra:
-                current_y += section_gap
-                draw.line([(gap, current_y - section_gap/2), (total_w-gap, current_y - section_gap/2)], fill=(60,60,60), width=2)
-                current_y = draw_section(extra, current_y)
-
-            # Side
-            if side:
-                current_y += section_gap
-                draw.line([(gap, current_y - section_gap/2), (total_w-gap, current_y - section_gap/2)], fill=(60,60,60), width=2)
-                draw.text((gap, current_y - section_gap + 2), "!Side Deck", font=font, fill=(200, 200, 200))
-                current_y = draw_section(side, current_y)
-
-            output_path = os.path.join(self.images_dir, f"deck_{int(time.time())}.jpg")
-            canvas.save(output_path, quality=90)
-            return output_path
-
+            canvas = render_worker.compose_deck(
+                deck_name, main, extra, side, images_cache, self.fonts.get(24), self.TILE_SIZE
+            )
+            return render_worker.save_jpeg(canvas, output_path)
         except Exception as e:
             logger.error(f"Draw Logic Error: {e}")
             return None
 
-    def _load_font(self):
-        """简单的字体加载封装"""
-        valid_extensions = {".ttf", ".ttc", ".otf"}
-        priority_files = ["msyh.ttc", "msyh.ttf", "simhei.ttf"]
-        
-        font_path = None
-        for f in priority_files:
-            p = os.path.join(self.plugin_dir, f)
-            if os.path.exists(p):
-                font_path = p
-                break
-        
-        if not font_path:
-             for filename in os.listdir(self.plugin_dir):
-                if os.path.splitext(filename)[1].lower() in valid_extensions:
-                    font_path = os.path.join(self.plugin_dir, filename)
-                    break
-        
-        if font_path:
-            try:
-                return ImageFont.truetype(font_path, 24)
-            except: pass
-        return ImageFont.load_default()
-    
-    def _cleanup_old_files(self):
-        """清理超过 24 小时的缓存文件"""
-        now = time.time()
-        expiration = 24 * 60 * 60 # 24小时
-        
-        # 清理 YDK
-        for f in os.listdir(self.cache_dir):
-            path = os.path.join(self.cache_dir, f)
-            if os.path.isfile(path) and (now - os.path.getmtime(path) > expiration):
-                try: os.remove(path)
-                except: pass
-                
-        # 顺便清理一下图片缓存
-        for f in os.listdir(self.images_dir):
-            path = os.path.join(self.images_dir, f)
-            if os.path.isfile(path) and (now - os.path.getmtime(path) > expiration):
-                try: os.remove(path)
-                except: pass
-
-    # [新增功能] 复制 YDK 文件 (用于卡组转存)
+    # [新增功能] 共享会话卡组 (用于卡组转存 / 分享)
     def copy_ydk_from_session(self, src_session_id: str, target_session_id: str) -> bool:
-        """将源会话的 YDK 复制给目标会话"""
-        src_path = os.path.join(self.cache_dir, f"deck_{src_session_id}.ydk")
-        target_path = os.path.join(self.cache_dir, f"deck_{target_session_id}.ydk")
-
-        if not os.path.exists(src_path):
-            return False
-        
-        try:
-            # 读取源文件
-            with open(src_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            # 写入目标文件
-            with open(target_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        except Exception as e:
-            logger.error(f"Copy YDK Error: {e}")
-            return False
+        """将源会话的卡组共享给目标会话 (只更新指针)"""
+        return self.deck_store.copy(src_session_id, target_session_id)
 
     # [新增功能] 通用卡片绘图 (用于起手/抽卡展示)
-    async def draw_cards_image(self, card_ids: List[str], title: str = "Cards") -> Optional[str]:
-        """绘制指定的一组卡片 ID"""
+    async def draw_cards_image(self, card_ids: List[str], title: str = "Cards") -> Optional[bytes]:
+        """绘制指定的一组卡片 ID，返回 JPEG 字节 (一次性图片，不写临时文件)"""
         if not HAS_PILLOW or not card_ids: return None
 
-        # 1. 下载图片
-        images_cache = {}
         unique_ids = list(set(card_ids))
-        
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            tasks = [self._download_image(session, cid) for cid in unique_ids]
-            results = await asyncio.gather(*tasks)
-            for cid, img in zip(unique_ids, results):
-                if img: images_cache[cid] = img
+
+        # 1. 多进程绘图 (已启用时)
+        if self.render_pool.enabled:
+            tile_paths = await self._prepare_tile_paths(unique_ids)
+            if not tile_paths: return None
+            result = await self.render_pool.submit(
+                render_worker.render_cards_job,
+                card_ids,
+                title,
+                tile_paths,
+                self.fonts.spec,
+                self.TILE_SIZE,
+            )
+            if result:
+                return result
+
+        # 2. 线程绘图：获取卡图瓦片
+        images_cache = await self._load_tiles(unique_ids)
 
         if not images_cache: return None
 
-        # 2. 同步绘图逻辑
         def _sync_draw():
             try:
-                card_w, card_h, gap = 82, 120, 6
-                # 动态计算画布宽度：最多一行 10 张，或者根据卡片数量自适应
-                cols = min(len(card_ids), 10)
-                rows = (len(card_ids) + cols - 1) // cols
-                
-                total_w = (card_w + gap) * cols + gap
-                total_h = (card_h + gap) * rows + gap + 30 # +30 for title
-                
-                # 黑色背景
-                canvas = Image.new("RGB", (total_w, total_h), (20, 20, 20))
-                draw = ImageDraw.Draw(canvas)
-                
-                # 绘制标题
-                font = self._load_font()
-                draw.text((gap, 5), title, font=font, fill=(255, 255, 255))
-                
-                start_y = 30
-                for i, cid in enumerate(card_ids):
-                    if cid in images_cache:
-                        r = i // cols
-                        c = i % cols
-                        x = gap + c * (card_w + gap)
-                        y = start_y + gap + r * (card_h + gap)
-                        canvas.paste(images_cache[cid], (x, y))
-                
-                output_path = os.path.join(self.images_dir, f"draw_{int(time.time())}_{random.randint(100,999)}.jpg")
-                canvas.save(output_path, quality=90)
-                return output_path
+                canvas = render_worker.compose_cards(
+                    card_ids, title, images_cache, self.fonts.get(24), self.TILE_SIZE
+                )
+                return render_worker.encode_jpeg(canvas)
             except Exception as e:
                 logger.error(f"Draw Cards Error: {e}")
                 return None
 
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, _sync_draw)
\ No newline at end of file
+        return await loop.run_in_executor(None, _sync_draw)